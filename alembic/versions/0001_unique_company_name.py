@@ -0,0 +1,48 @@
+"""unique company name
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+    if "companies" not in tables:
+        return
+
+    op.execute("UPDATE companies SET name = btrim(name) WHERE name <> btrim(name)")
+
+    for table in ["aum_snapshots", "scrape_logs", "scrape_job_items"]:
+        if table in tables:
+            op.execute(f"""
+                UPDATE {table} AS child SET company_id = ranked.keep_id
+                FROM (SELECT id, MIN(id) OVER (PARTITION BY name) AS keep_id FROM companies) AS ranked
+                WHERE child.company_id = ranked.id AND ranked.id <> ranked.keep_id
+            """)
+
+    if "page_cache" in tables:
+        op.execute("""
+            DELETE FROM page_cache USING companies AS duplicate, companies AS kept
+            WHERE page_cache.company_id = duplicate.id AND duplicate.name = kept.name AND duplicate.id > kept.id
+        """)
+
+    op.execute("""
+        DELETE FROM companies AS duplicate USING companies AS kept
+        WHERE duplicate.name = kept.name AND duplicate.id > kept.id
+    """)
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_companies_name ON companies (name)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_companies_name")
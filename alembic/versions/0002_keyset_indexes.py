@@ -0,0 +1,38 @@
+"""keyset pagination indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_aum_snapshots_company_created", "aum_snapshots", "company_id, created_at, id"),
+    ("ix_aum_snapshots_created", "aum_snapshots", "created_at, id"),
+    ("ix_scrape_logs_company_created", "scrape_logs", "company_id, created_at, id"),
+    ("ix_scrape_logs_created", "scrape_logs", "created_at, id"),
+]
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if table in tables:
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
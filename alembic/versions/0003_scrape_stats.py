@@ -0,0 +1,37 @@
+"""scrape stats counters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "scrape_logs" in tables and "source_type" not in {column["name"] for column in inspector.get_columns("scrape_logs")}:
+        op.add_column("scrape_logs", sa.Column("source_type", sa.String(), nullable=True))
+
+    if "scrape_stats" not in tables:
+        op.create_table(
+            "scrape_stats",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("value", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("scrape_stats")
+    op.drop_column("scrape_logs", "source_type")
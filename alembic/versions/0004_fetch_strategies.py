@@ -0,0 +1,30 @@
+"""per-domain fetch strategies
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "fetch_strategies" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "fetch_strategies",
+            sa.Column("domain", sa.String(), primary_key=True),
+            sa.Column("strategy", sa.String(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("fetch_strategies")
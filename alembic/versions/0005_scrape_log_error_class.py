@@ -0,0 +1,26 @@
+"""scrape log error class
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "scrape_logs" in inspector.get_table_names() and "error_class" not in {column["name"] for column in inspector.get_columns("scrape_logs")}:
+        op.add_column("scrape_logs", sa.Column("error_class", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("scrape_logs", "error_class")
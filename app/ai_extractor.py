@@ -1,29 +1,60 @@
 import asyncio
 import re
-import openai
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.models import Usage
-from datetime import datetime, date
-
-openai.api_key = settings.openai_api_key
+from app.budget import budget_governor
+from app.llm_cache import llm_cache
+from app.llm_batcher import ExtractionBatcher
+from app.llm_gateway import llm_gateway
+from app.tokenizer import count_tokens, truncate_to_tokens
+from typing import Tuple
 
 class AIExtractor:
     def __init__(self):
         self.daily_budget = settings.daily_budget_usd
         self.max_tokens = settings.max_tokens_per_request
+        self.model = "gpt-4o"
+        self.system_prompt = "Você é um assistente especializado em extrair informações financeiras de textos."
+        self.batcher = ExtractionBatcher(self)
+    
+    def build_prompt(self, company_name: str, content: str) -> str:
+        return f"Qual é o patrimônio sob gestão (AUM) anunciado por {company_name}? Responda somente com o número e a unidade (ex.: R$ 2,3 bi) ou NAO_DISPONIVEL.\n\nConteúdo da fonte: {content}"
+    
+    def content_budget(self, company_name: str) -> int:
+        overhead = count_tokens(self.system_prompt, self.model) + count_tokens(self.build_prompt(company_name, ""), self.model)
+        return max(0, self.max_tokens - overhead - 50 - 10)
+    
+    def build_messages(self, company_name: str, content: str) -> list:
+        prompt = self.build_prompt(company_name, truncate_to_tokens(content, self.content_budget(company_name), self.model))
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def estimate_tokens(self, messages: list, max_tokens: int) -> int:
+        return sum(count_tokens(message["content"], self.model) for message in messages) + max_tokens
     
-    async def check_budget_and_run(self, db: Session) -> bool:
-        today = date.today()
-        usage = db.query(Usage).filter(Usage.date >= today).first()
+    async def complete(self, messages: list, max_tokens: int) -> Tuple[str, int]:
+        return await llm_gateway.complete(self.model, messages, max_tokens)
+    
+    async def complete_single(self, company_name: str, content: str) -> str:
+        ai_response, tokens_used = await self.complete(self.build_messages(company_name, content), 50)
+        await budget_governor.record(tokens_used)
+        return ai_response
+    
+    async def extract_aum(self, company_name: str, content: str, source_url: str, db: AsyncSession, bypass_cache: bool = False) -> dict:
+        messages = self.build_messages(company_name, content)
         
-        if usage and usage.cost_usd >= self.daily_budget * 0.8:
-            return False
+        cache_key = llm_cache.make_key(self.model, messages)
+        if settings.llm_cache_enabled and not bypass_cache:
+            cached_response = await llm_cache.get(cache_key, db)
+            if cached_response is not None:
+                return self.parse_aum_response(cached_response, source_url)
         
-        return True
-    
-    async def extract_aum(self, company_name: str, content: str, source_url: str, db: Session) -> dict:
-        if not await self.check_budget_and_run(db):
+        await db.commit()
+        
+        reservation = await budget_governor.reserve(self.estimate_tokens(messages, 50))
+        if reservation is None:
             return {
                 "aum_value": "NAO_DISPONIVEL",
                 "aum_numeric": None,
@@ -31,29 +62,15 @@ class AIExtractor:
                 "confidence_score": 0.0,
                 "is_available": False,
                 "source_url": source_url,
-                "source_type": "ai_extraction"
+                "source_type": "ai_extraction",
+                "error": "budget_exceeded"
             }
         
-        prompt = f"Qual é o patrimônio sob gestão (AUM) anunciado por {company_name}? Responda somente com o número e a unidade (ex.: R$ 2,3 bi) ou NAO_DISPONIVEL.\n\nConteúdo da fonte: {content[:1000]}"
-        
         try:
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em extrair informações financeiras de textos."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.1
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
-            tokens_used = response.usage.total_tokens
-            
-            await self._log_usage(db, tokens_used)
-            
-            return self.parse_aum_response(ai_response, source_url)
-            
+            if settings.llm_batch_enabled:
+                ai_response = await self.batcher.submit(company_name, content)
+            else:
+                ai_response = await self.complete_single(company_name, content)
         except Exception as e:
             return {
                 "aum_value": "NAO_DISPONIVEL",
@@ -62,8 +79,19 @@ class AIExtractor:
                 "confidence_score": 0.0,
                 "is_available": False,
                 "source_url": source_url,
-                "source_type": "ai_extraction"
+                "source_type": "ai_extraction",
+                "error": str(e)
             }
+        finally:
+            await budget_governor.release(reservation)
+        
+        if settings.llm_cache_enabled:
+            try:
+                await llm_cache.put(cache_key, self.model, ai_response, db)
+            except Exception:
+                await db.rollback()
+        
+        return self.parse_aum_response(ai_response, source_url)
     
     def parse_aum_response(self, response: str, source_url: str) -> dict:
         if "NAO_DISPONIVEL" in response.upper():
@@ -132,25 +160,6 @@ class AIExtractor:
         
         multiplier = unit_mapping.get(unit, 1)
         return value * multiplier
-    
-    async def _log_usage(self, db: Session, tokens: int):
-        today = date.today()
-        usage = db.query(Usage).filter(Usage.date >= today).first()
-        
-        if usage:
-            usage.total_tokens += tokens
-            usage.requests_count += 1
-            usage.cost_usd = (usage.total_tokens / 1000) * 0.01
-        else:
-            usage = Usage(
-                date=datetime.utcnow(),
-                total_tokens=tokens,
-                requests_count=1,
-                cost_usd=(tokens / 1000) * 0.01
-            )
-            db.add(usage)
-        
-        db.commit()
 
 
 ai_extractor = AIExtractor()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+from playwright.async_api import async_playwright
+from app.config import settings
+from app.fetcher import DEFAULT_HEADERS
+
+
+def process_rss_mb(pids: Iterable[int]) -> float:
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm") as statm:
+                total += int(statm.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+    return total / (1024 * 1024)
+
+
+class PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.memory_mb = 0.0
+
+    @property
+    def is_alive(self) -> bool:
+        return self.browser.is_connected()
+
+    def needs_recycle(self) -> bool:
+        return (
+            self.pages_served >= settings.browser_max_pages
+            or self.memory_mb >= settings.browser_max_memory_mb
+        )
+
+
+class BrowserPool:
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or settings.browser_pool_size
+        self._playwright = None
+        self._slots: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self.launches = 0
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._playwright = None
+            self._slots = None
+            self._start_lock = asyncio.Lock()
+            self._loop = loop
+
+        async with self._start_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+                self._slots = asyncio.Queue()
+                for _ in range(self.size):
+                    self._slots.put_nowait(None)
+
+    async def _launch(self) -> PooledBrowser:
+        browser = await self._playwright.chromium.launch(headless=True)
+        self.launches += 1
+        return PooledBrowser(browser)
+
+    async def _retire(self, pooled: PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in settings.browser_blocked_resource_types:
+            return True
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == blocked or host.endswith('.' + blocked) for blocked in settings.browser_blocked_hosts)
+
+    async def _route(self, route):
+        try:
+            if self.should_block(route.request.resource_type, route.request.url):
+                await route.abort()
+            else:
+                await route.continue_()
+        except Exception:
+            pass
+
+    async def _sample_memory(self, pooled: PooledBrowser):
+        try:
+            session = await pooled.browser.new_browser_cdp_session()
+            try:
+                info = await session.send("SystemInfo.getProcessInfo")
+            finally:
+                await session.detach()
+            pooled.memory_mb = process_rss_mb(process["id"] for process in info.get("processInfo", []))
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self, block_resources: bool = False):
+        await self._ensure_started()
+        pooled = await self._slots.get()
+        try:
+            if pooled is not None and (not pooled.is_alive or pooled.needs_recycle()):
+                await self._retire(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = await self._launch()
+
+            context = await pooled.browser.new_context(user_agent=DEFAULT_HEADERS['User-Agent'])
+            try:
+                if block_resources:
+                    await context.route("**/*", self._route)
+                page = await context.new_page()
+                yield page
+                await self._sample_memory(pooled)
+            finally:
+                pooled.pages_served += 1
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+        finally:
+            if pooled is not None and not pooled.is_alive:
+                pooled = None
+            self._slots.put_nowait(pooled)
+
+    async def close(self):
+        if self._playwright is None or self._loop is not asyncio.get_running_loop():
+            return
+
+        while not self._slots.empty():
+            pooled = self._slots.get_nowait()
+            if pooled is not None:
+                await self._retire(pooled)
+
+        await self._playwright.stop()
+        self._playwright = None
+        self._slots = None
@@ -0,0 +1,184 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from app.config import settings
+from app.models import Usage
+
+
+class MemoryBudgetCounter:
+    def __init__(self):
+        self._spent: Dict[str, float] = {}
+
+    async def seed(self, day: str, amount: float):
+        self._spent.setdefault(day, amount)
+
+    async def incr(self, day: str, amount: float) -> float:
+        self._spent[day] = self._spent.get(day, 0.0) + amount
+        return self._spent[day]
+
+
+class RedisBudgetCounter:
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+            self._loop = loop
+        return self._client
+
+    def key(self, day: str) -> str:
+        return f"llm_budget:{day}"
+
+    async def seed(self, day: str, amount: float):
+        await self.client().set(self.key(day), amount, nx=True, ex=2 * 24 * 3600)
+
+    async def incr(self, day: str, amount: float) -> float:
+        return float(await self.client().incrbyfloat(self.key(day), amount))
+
+
+class BudgetGovernor:
+    def __init__(self, counter=None, session_factory=None):
+        if counter is None:
+            counter = RedisBudgetCounter(settings.redis_url) if settings.budget_redis_enabled else MemoryBudgetCounter()
+        self.counter = counter
+        self.session_factory = session_factory
+        self.limit_usd = settings.daily_budget_usd * 0.8
+        self.cost_per_1k = settings.llm_cost_per_1k_tokens
+        self.interval = settings.budget_flush_interval_seconds
+        self._seeded = set()
+        self._pending: Dict[str, List[int]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.rejected = 0
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _seed_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def cost(self, tokens: int) -> float:
+        return (tokens / 1000) * self.cost_per_1k
+
+    def today(self) -> str:
+        return date.today().isoformat()
+
+    async def _ensure_seeded(self, day: str):
+        if day in self._seeded:
+            return
+
+        async with self._seed_lock():
+            if day in self._seeded:
+                return
+            start = date.fromisoformat(day)
+            async with self._session() as db:
+                usage = await db.scalar(select(Usage).where(
+                    Usage.date >= start,
+                    Usage.date < start + timedelta(days=1)
+                ).limit(1))
+            await self.counter.seed(day, usage.cost_usd if usage else 0.0)
+            self._seeded.add(day)
+
+    async def reserve(self, estimated_tokens: int) -> Optional[Tuple[str, float]]:
+        day = self.today()
+        await self._ensure_seeded(day)
+
+        amount = self.cost(estimated_tokens)
+        spent = await self.counter.incr(day, amount)
+        if spent > self.limit_usd:
+            await self.counter.incr(day, -amount)
+            self.rejected += 1
+            return None
+        return day, amount
+
+    async def release(self, reservation: Tuple[str, float]):
+        day, amount = reservation
+        await self.counter.incr(day, -amount)
+
+    async def record(self, tokens_used: int):
+        day = self.today()
+        await self._ensure_seeded(day)
+        await self.counter.incr(day, self.cost(tokens_used))
+
+        pending = self._pending.setdefault(day, [0, 0])
+        pending[0] += tokens_used
+        pending[1] += 1
+
+    async def spent(self) -> float:
+        day = self.today()
+        await self._ensure_seeded(day)
+        return await self.counter.incr(day, 0.0)
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            async with self._session() as db:
+                for day, (tokens, requests) in pending.items():
+                    start = date.fromisoformat(day)
+                    usage = await db.scalar(select(Usage).where(
+                        Usage.date >= start,
+                        Usage.date < start + timedelta(days=1)
+                    ).limit(1))
+
+                    if usage is None:
+                        db.add(Usage(
+                            date=datetime.combine(start, datetime.min.time()),
+                            total_tokens=tokens,
+                            requests_count=requests,
+                            cost_usd=self.cost(tokens)
+                        ))
+                    else:
+                        await db.execute(update(Usage).where(Usage.id == usage.id).values(
+                            total_tokens=Usage.total_tokens + tokens,
+                            requests_count=Usage.requests_count + requests,
+                            cost_usd=(Usage.total_tokens + tokens) / 1000.0 * self.cost_per_1k
+                        ))
+                await db.commit()
+        except Exception:
+            for day, (tokens, requests) in pending.items():
+                current = self._pending.setdefault(day, [0, 0])
+                current[0] += tokens
+                current[1] += requests
+            raise
+
+        return sum(requests for _, requests in pending.values())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        await self.flush()
+
+
+budget_governor = BudgetGovernor()
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Dict, List, Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.database import upsert
+from app.models import PageCache
+from app.stats import scrape_stats
+
+UPSERT_KEYS = {PageCache: ["company_id", "url"]}
+
+
+class BulkWriter:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.batch_size = settings.bulk_write_batch_size
+        self.interval = settings.bulk_write_interval_seconds
+        self._buffers: Dict[type, List[dict]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._pending_flushes = set()
+        self.rows_written = 0
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._buffers.values())
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def add(self, model, row: dict):
+        self._buffers.setdefault(model, []).append(row)
+
+        if self.pending >= self.batch_size:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._pending_flushes.add(task)
+            task.add_done_callback(self._pending_flushes.discard)
+
+    async def flush(self) -> int:
+        buffers, self._buffers = self._buffers, {}
+        if not buffers:
+            return 0
+
+        try:
+            await self._write(buffers)
+        except Exception:
+            for model, rows in buffers.items():
+                self._buffers[model] = rows + self._buffers.get(model, [])
+            raise
+
+        written = sum(len(rows) for rows in buffers.values())
+        self.rows_written += written
+        return written
+
+    async def _write(self, buffers: Dict[type, List[dict]]):
+        async with self._session() as db:
+            deltas = await scrape_stats.collect(buffers, db)
+            for model, rows in buffers.items():
+                keys = UPSERT_KEYS.get(model)
+                if keys is None:
+                    await db.execute(insert(model), rows)
+                    continue
+
+                rows = list({tuple(row[key] for key in keys): row for row in rows}.values())
+                statement = upsert(model, db)
+                await db.execute(statement.on_conflict_do_update(
+                    index_elements=keys,
+                    set_={column: statement.excluded[column] for column in rows[0] if column not in keys}
+                ), rows)
+            await scrape_stats.increment(deltas, db)
+            await db.commit()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass
+
+    def start(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+
+        await asyncio.gather(*self._pending_flushes, return_exceptions=True)
+        await self.flush()
+
+
+bulk_writer = BulkWriter()
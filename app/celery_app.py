@@ -0,0 +1,25 @@
+from celery import Celery
+from app.config import settings
+
+celery_app = Celery(
+    "scraper",
+    broker=settings.rabbitmq_url,
+    backend=settings.redis_url,
+    include=["app.tasks"]
+)
+
+celery_app.conf.update(
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+    task_serializer="json",
+    accept_content=["json"],
+    timezone="UTC",
+    beat_schedule={
+        "rescrape-cycle": {
+            "task": "app.tasks.rescrape_cycle_task",
+            "schedule": settings.rescrape_interval_seconds,
+        },
+    },
+)
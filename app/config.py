@@ -1,12 +1,123 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, List
 
 class Settings(BaseSettings):
     database_url: str
     rabbitmq_url: str
+    redis_url: str = "redis://localhost:6379/0"
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: float = 30.0
     openai_api_key: str
+    openai_base_url: Optional[str] = None
     daily_budget_usd: float
     max_tokens_per_request: int
+    llm_cost_per_1k_tokens: float = 0.01
+    budget_redis_enabled: bool = False
+    budget_flush_interval_seconds: float = 5.0
+    http_pool_size: int = 100
+    http_pool_per_host: int = 4
+    http_dns_cache_ttl: int = 300
+    http_keepalive_timeout: float = 30.0
+    http_connect_timeout: float = 10.0
+    http_read_timeout: float = 20.0
+    fetch_max_retries: int = 2
+    fetch_backoff_base_seconds: float = 0.5
+    fetch_backoff_max_seconds: float = 10.0
+    negative_dns_ttl_seconds: float = 900.0
+    negative_dns_threshold: int = 3
+    circuit_breaker_threshold: int = 5
+    circuit_breaker_reset_seconds: float = 300.0
+    browser_pool_size: int = 2
+    browser_max_pages: int = 50
+    browser_max_memory_mb: int = 512
+    browser_lean_mode: bool = True
+    fetch_strategy_ttl_hours: float = 30 * 24
+    static_min_text_chars: int = 200
+    rendered_text_gain: float = 2.0
+    browser_navigation_timeout_ms: int = 15000
+    browser_ready_timeout_ms: int = 5000
+    browser_blocked_resource_types: List[str] = ["image", "media", "font"]
+    browser_blocked_hosts: List[str] = [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "connect.facebook.net",
+        "hotjar.com",
+        "segment.io",
+        "mixpanel.com",
+        "ads.linkedin.com",
+        "analytics.twitter.com",
+    ]
+    browser_ready_selectors: Dict[str, str] = {
+        "linkedin.com": "main, section.core-section-container",
+        "instagram.com": "header section, main article",
+        "twitter.com": "[data-testid='UserDescription'], [data-testid='primaryColumn']",
+        "x.com": "[data-testid='UserDescription'], [data-testid='primaryColumn']",
+        "facebook.com": "[role='main']",
+    }
+    max_concurrent_companies: int = 20
+    job_chunk_size: int = 20
+    csv_import_chunk_size: int = 5000
+    export_batch_size: int = 1000
+    crawl_enabled: bool = True
+    crawl_max_pages: int = 3
+    crawl_max_depth: int = 2
+    crawl_site_ttl_seconds: float = 24 * 3600
+    crawl_max_sitemaps: int = 2
+    crawl_max_sitemap_urls: int = 5000
+    crawl_max_sitemap_candidates: int = 50
+    early_exit_confidence: Optional[float] = 0.9
+    heuristic_confidence_threshold: float = 0.9
+    bulk_write_batch_size: int = 500
+    bulk_write_interval_seconds: float = 2.0
+    stats_reconcile_interval_seconds: float = 3600.0
+    progress_redis_enabled: bool = False
+    progress_queue_size: int = 1000
+    progress_heartbeat_seconds: float = 15.0
+    rescrape_interval_seconds: float = 3600.0
+    rescrape_base_interval_hours: float = 7 * 24
+    rescrape_min_interval_hours: float = 24
+    rescrape_retry_base_hours: float = 6
+    rescrape_volatility_weight: float = 6.0
+    rescrape_max_fetches_per_cycle: int = 200
+    rescrape_max_llm_tokens_per_cycle: int = 400000
+    rescrape_source_weights: Dict[str, float] = {
+        "website": 1.0,
+        "linkedin": 0.6,
+        "instagram": 0.3,
+        "x": 0.3,
+    }
+    llm_cache_enabled: bool = True
+    llm_cache_ttl_seconds: int = 30 * 24 * 3600
+    llm_cache_max_entries: int = 50000
+    llm_cache_memory_entries: int = 5000
+    llm_batch_enabled: bool = True
+    llm_batch_token_budget: int = 6000
+    llm_batch_max_items: int = 20
+    llm_batch_linger_seconds: float = 0.5
+    llm_requests_per_minute: int = 500
+    llm_tokens_per_minute: int = 30000
+    llm_burst_seconds: float = 10.0
+    llm_initial_concurrency: int = 8
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 32
+    llm_max_retries: int = 5
+    llm_timeout_seconds: float = 60.0
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 60.0
+    global_max_inflight: int = 50
+    domain_max_inflight: int = 2
+    domain_requests_per_second: float = 1.0
+    domain_burst: int = 2
+    domain_rate_overrides: Dict[str, float] = {
+        "linkedin.com": 0.2,
+        "instagram.com": 0.2,
+        "twitter.com": 0.2,
+        "x.com": 0.2,
+        "facebook.com": 0.2,
+    }
     
     class Config:
         env_file = ".env"
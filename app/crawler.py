@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import itertools
+import re
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urldefrag, urlparse, unquote
+from urllib.robotparser import RobotFileParser
+from lxml import etree
+from lxml import html as lxml_html
+from app.config import settings
+from app.fetcher import DEFAULT_HEADERS
+from app.politeness import DomainScheduler
+from app.scraper import AUM_KEYWORDS
+
+PAGE_TERMS = {
+    "patrimonio sob gestao": 5,
+    "assets under management": 5,
+    "aum": 4,
+    "sobre": 3,
+    "sobre nos": 2,
+    "quem somos": 3,
+    "institucional": 3,
+    "about": 3,
+    "about us": 2,
+    "who we are": 3,
+    "a gestora": 3,
+    "gestora": 1,
+    "empresa": 2,
+    "em numeros": 3,
+    "numeros": 2,
+    "historia": 1,
+    "blog": -4,
+    "noticias": -4,
+    "news": -4,
+    "imprensa": -3,
+    "contato": -4,
+    "contact": -4,
+    "trabalhe conosco": -4,
+    "carreiras": -4,
+    "careers": -4,
+    "vagas": -4,
+    "login": -5,
+    "area do cliente": -5,
+    "politica": -4,
+    "privacidade": -4,
+    "privacy": -4,
+    "cookies": -5,
+    "lgpd": -5,
+    "ouvidoria": -4,
+    "termos": -4,
+}
+
+KNOWN_PAGE_SCORE = 10.0
+
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".zip", ".rar", ".doc", ".docx",
+    ".xls", ".xlsx", ".ppt", ".pptx", ".mp4", ".mp3", ".css", ".js", ".xml", ".gz",
+)
+
+
+def strip_accents(text: str) -> str:
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def normalize_terms(text: str) -> str:
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', strip_accents(text.lower())).split())
+
+
+def build_term_patterns() -> List[Tuple[re.Pattern, int]]:
+    weights = {normalize_terms(term): weight for term, weight in PAGE_TERMS.items()}
+    for keyword in AUM_KEYWORDS:
+        term = normalize_terms(keyword)
+        if len(term) >= 4:
+            weights.setdefault(term, 1)
+    return [(re.compile(r'\b' + re.escape(term) + r'\b'), weight) for term, weight in weights.items()]
+
+
+TERM_PATTERNS = build_term_patterns()
+
+
+def score_link(url: str, text: str = "") -> float:
+    parsed = urlparse(url)
+    haystack = normalize_terms(f"{unquote(parsed.path)} {unquote(parsed.query)} {text}")
+    return float(sum(weight for pattern, weight in TERM_PATTERNS if pattern.search(haystack)))
+
+
+def url_key(url: str) -> str:
+    parsed = urlparse(urldefrag(url)[0])
+    path = parsed.path.rstrip('/') or '/'
+    return f"{DomainScheduler.domain_for(url)}{path}" + (f"?{parsed.query}" if parsed.query else "")
+
+
+class CrawlFrontier:
+    def __init__(self, root_url: str, max_pages: Optional[int] = None, max_depth: Optional[int] = None):
+        self.domain = DomainScheduler.domain_for(root_url)
+        self.max_pages = settings.crawl_max_pages if max_pages is None else max_pages
+        self.max_depth = settings.crawl_max_depth if max_depth is None else max_depth
+        self.robots: Optional[RobotFileParser] = None
+        self.seen = {url_key(root_url)}
+        self.depths: Dict[str, int] = {url_key(root_url): 0}
+        self.fetched = 0
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._order = itertools.count()
+
+    def in_scope(self, url: str) -> bool:
+        parsed = urlparse(url)
+        return (
+            parsed.scheme in ("http", "https")
+            and DomainScheduler.domain_for(url) == self.domain
+            and not parsed.path.lower().endswith(SKIPPED_EXTENSIONS)
+        )
+
+    def add(self, url: str, score: float, depth: int):
+        url = urldefrag(url)[0]
+        key = url_key(url)
+        if score <= 0 or depth > self.max_depth or key in self.seen or not self.in_scope(url):
+            return
+        self.seen.add(key)
+        heapq.heappush(self._heap, (-(score - depth + 1), next(self._order), url, depth))
+
+    def add_links(self, page_url: str, html: str):
+        depth = self.depths.get(url_key(page_url), 0) + 1
+        if depth > self.max_depth or not html:
+            return
+        try:
+            document = lxml_html.fromstring(html)
+        except (etree.ParserError, ValueError):
+            return
+
+        for anchor in document.iter('a'):
+            href = (anchor.get('href') or '').strip()
+            if not href or href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
+                continue
+            url = urljoin(page_url, href)
+            self.add(url, score_link(url, anchor.text_content()), depth)
+
+    def seed(self, robots: Optional[RobotFileParser], sitemap_urls: List[str], known_urls: Optional[List[str]] = None):
+        self.robots = robots
+        for url in known_urls or []:
+            self.add(url, KNOWN_PAGE_SCORE, 1)
+        for url in sitemap_urls:
+            self.add(url, score_link(url), 1)
+
+    def allowed(self, url: str) -> bool:
+        return self.robots is None or self.robots.can_fetch(DEFAULT_HEADERS['User-Agent'], url)
+
+    def pop(self) -> Optional[str]:
+        while self._heap and self.fetched < self.max_pages:
+            _, _, url, depth = heapq.heappop(self._heap)
+            if not self.allowed(url):
+                continue
+            self.fetched += 1
+            self.depths[url_key(url)] = depth
+            return url
+        return None
+
+
+class FocusedCrawler:
+    def __init__(self, scraper=None):
+        self.scraper = scraper
+        self.ttl = settings.crawl_site_ttl_seconds
+        self._sites: Dict[str, Tuple[float, Optional[RobotFileParser], List[str]]] = {}
+
+    def _scraper(self):
+        if self.scraper is None:
+            from app.scraper import scraper
+            self.scraper = scraper
+        return self.scraper
+
+    async def _fetch_text(self, url: str) -> Optional[str]:
+        content, status_code, _, _ = await self._scraper().fetch_page(url, False)
+        return content if status_code == 200 and content else None
+
+    def parse_robots(self, content: Optional[str]) -> Optional[RobotFileParser]:
+        if not content:
+            return None
+        robots = RobotFileParser()
+        robots.parse(content.splitlines())
+        return robots
+
+    def parse_sitemap(self, content: Optional[str]) -> Tuple[List[str], List[str]]:
+        if not content:
+            return [], []
+        try:
+            root = etree.fromstring(content.encode('utf-8', errors='replace'), parser=etree.XMLParser(recover=True))
+        except etree.XMLSyntaxError:
+            return [], []
+        if root is None:
+            return [], []
+
+        locations = [element.text.strip() for element in root.iter('{*}loc') if element.text]
+        if etree.QName(root).localname == 'sitemapindex':
+            return [], locations
+        return locations, []
+
+    async def _load_site(self, url: str) -> Tuple[Optional[RobotFileParser], List[str]]:
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        default_sitemap = f"{origin}/sitemap.xml"
+
+        robots_content, sitemap_content = await asyncio.gather(
+            self._fetch_text(f"{origin}/robots.txt"),
+            self._fetch_text(default_sitemap)
+        )
+        robots = self.parse_robots(robots_content)
+
+        pages, children = self.parse_sitemap(sitemap_content)
+        declared = [sitemap for sitemap in (robots.site_maps() or []) if sitemap != default_sitemap] if robots else []
+        pending = (declared + children)[:settings.crawl_max_sitemaps]
+        for sitemap_url in pending:
+            child_pages, _ = self.parse_sitemap(await self._fetch_text(sitemap_url))
+            pages.extend(child_pages)
+
+        scored = sorted(
+            ((score_link(page), page) for page in pages[:settings.crawl_max_sitemap_urls]),
+            key=lambda item: -item[0]
+        )
+        return robots, [page for score, page in scored if score > 0][:settings.crawl_max_sitemap_candidates]
+
+    async def site_info(self, url: str) -> Tuple[Optional[RobotFileParser], List[str]]:
+        domain = DomainScheduler.domain_for(url)
+        cached = self._sites.get(domain)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1], cached[2]
+
+        robots, sitemap_urls = await self._load_site(url)
+        self._sites[domain] = (time.monotonic(), robots, sitemap_urls)
+        return robots, sitemap_urls
+
+
+focused_crawler = FocusedCrawler()
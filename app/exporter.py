@@ -0,0 +1,200 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Dict, Any
+from sqlalchemy import select, func, and_
+from app.config import settings
+from app.models import Company, AumSnapshot
+
+
+EXPORT_COLUMNS = [
+    "Company Name",
+    "Website",
+    "LinkedIn",
+    "Instagram",
+    "X (Twitter)",
+    "AUM Value",
+    "AUM Numeric",
+    "AUM Unit",
+    "Source URL",
+    "Source Type",
+    "Confidence Score",
+    "Last Updated",
+]
+
+EXPORT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ChunkSink:
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+class ResultExporter:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.batch_size = settings.export_batch_size
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def latest_query(self, filters: Dict[str, Any]):
+        ranked = select(
+            AumSnapshot,
+            func.row_number().over(
+                partition_by=AumSnapshot.company_id,
+                order_by=(AumSnapshot.created_at.desc(), AumSnapshot.id.desc())
+            ).label("rank")
+        ).subquery()
+
+        query = select(
+            Company.name,
+            Company.url_site,
+            Company.url_linkedin,
+            Company.url_instagram,
+            Company.url_x,
+            ranked.c.aum_value,
+            ranked.c.aum_numeric,
+            ranked.c.aum_unit,
+            ranked.c.source_url,
+            ranked.c.source_type,
+            ranked.c.confidence_score,
+            ranked.c.created_at,
+        ).outerjoin(
+            ranked, and_(ranked.c.company_id == Company.id, ranked.c.rank == 1)
+        ).order_by(Company.id)
+
+        if filters.get("company_ids"):
+            query = query.where(Company.id.in_(filters["company_ids"]))
+        if filters.get("only_with_aum"):
+            query = query.where(ranked.c.id.isnot(None))
+        if filters.get("min_confidence") is not None:
+            query = query.where(ranked.c.confidence_score >= filters["min_confidence"])
+        if filters.get("source_type"):
+            query = query.where(ranked.c.source_type == filters["source_type"])
+        if filters.get("updated_since"):
+            query = query.where(ranked.c.created_at >= filters["updated_since"])
+        return query
+
+    def format_row(self, row) -> list:
+        found = row.aum_value is not None
+        return [
+            row.name,
+            row.url_site or "",
+            row.url_linkedin or "",
+            row.url_instagram or "",
+            row.url_x or "",
+            row.aum_value if found else "NAO_DISPONIVEL",
+            row.aum_numeric if found else None,
+            row.aum_unit if found else None,
+            row.source_url if found else "",
+            row.source_type if found else "",
+            row.confidence_score if found else 0.0,
+            row.created_at.replace(tzinfo=None) if found else None,
+        ]
+
+    async def batches(self, filters: Dict[str, Any]) -> AsyncIterator[List[list]]:
+        async with self._session() as db:
+            result = await db.stream(self.latest_query(filters).execution_options(yield_per=self.batch_size))
+            async for partition in result.partitions(self.batch_size):
+                yield [self.format_row(row) for row in partition]
+
+    async def stream_csv(self, filters: Dict[str, Any]) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        async for batch in self.batches(filters):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([
+                [value.isoformat() if isinstance(value, datetime) else value for value in row]
+                for row in batch
+            ])
+            yield buffer.getvalue().encode("utf-8")
+
+    async def stream_xlsx(self, filters: Dict[str, Any]) -> AsyncIterator[bytes]:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("AUM")
+        sheet.append(EXPORT_COLUMNS)
+        async for batch in self.batches(filters):
+            for row in batch:
+                sheet.append(row)
+
+        handle, path = tempfile.mkstemp(suffix=".xlsx")
+        os.close(handle)
+        try:
+            await asyncio.to_thread(workbook.save, path)
+            with open(path, "rb") as output:
+                while True:
+                    chunk = await asyncio.to_thread(output.read, 64 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.unlink(path)
+
+    async def stream_parquet(self, filters: Dict[str, Any]) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            (column, pa.float64() if column in ("AUM Numeric", "Confidence Score")
+             else pa.timestamp("us") if column == "Last Updated" else pa.string())
+            for column in EXPORT_COLUMNS
+        ])
+        sink = ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            async for batch in self.batches(filters):
+                columns = list(zip(*batch))
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                ))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def stream(self, export_format: str, filters: Optional[Dict[str, Any]] = None) -> AsyncIterator[bytes]:
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        return getattr(self, f"stream_{export_format}")(filters or {})
+
+
+result_exporter = ResultExporter()
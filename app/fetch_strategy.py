@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from app.config import settings
+from app.database import upsert
+from app.models import FetchStrategy
+
+STATIC = "static"
+BROWSER = "browser"
+
+
+class FetchStrategyStore:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.ttl = timedelta(hours=settings.fetch_strategy_ttl_hours)
+        self._strategies: Optional[Dict[str, Tuple[str, datetime]]] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def _load_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    async def _ensure_loaded(self):
+        if self._strategies is not None:
+            return
+        async with self._load_lock():
+            if self._strategies is None:
+                async with self._session() as db:
+                    rows = (await db.execute(select(FetchStrategy.domain, FetchStrategy.strategy, FetchStrategy.updated_at))).all()
+                self._strategies = {domain: (strategy, updated_at) for domain, strategy, updated_at in rows}
+
+    async def get(self, domain: str) -> Optional[str]:
+        await self._ensure_loaded()
+        entry = self._strategies.get(domain)
+        if entry is None or datetime.utcnow() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    async def remember(self, domain: str, strategy: str):
+        await self._ensure_loaded()
+        now = datetime.utcnow()
+        self._strategies[domain] = (strategy, now)
+
+        async with self._session() as db:
+            statement = upsert(FetchStrategy, db)
+            await db.execute(statement.values(domain=domain, strategy=strategy, updated_at=now).on_conflict_do_update(
+                index_elements=[FetchStrategy.domain],
+                set_={"strategy": strategy, "updated_at": now}
+            ))
+            await db.commit()
+
+
+fetch_strategies = FetchStrategyStore()
@@ -0,0 +1,56 @@
+import asyncio
+import aiohttp
+from typing import Optional, Dict, Any
+from app.config import settings
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+}
+
+
+class HttpFetcher:
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=settings.http_pool_size,
+            limit_per_host=settings.http_pool_per_host,
+            ttl_dns_cache=settings.http_dns_cache_ttl,
+            keepalive_timeout=settings.http_keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=settings.http_connect_timeout,
+            sock_read=settings.http_read_timeout,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=DEFAULT_HEADERS)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = self._build_session()
+            self._loop = loop
+        return self._session
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        session = await self.get_session()
+        async with session.get(url, headers=headers, allow_redirects=True) as response:
+            response.raise_for_status()
+            content = await response.text(errors='replace')
+            return {
+                "content": content,
+                "status_code": response.status,
+                "headers": {key.lower(): value for key, value in response.headers.items()},
+                "url": str(response.url),
+            }
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
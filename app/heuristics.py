@@ -0,0 +1,102 @@
+import re
+from typing import Optional, Dict, Any, List
+from app.ai_extractor import ai_extractor
+
+
+AMOUNT_PATTERN = re.compile(
+    r'(R\$|US\$|U\$|\$|€|£)?\s*'
+    r'(\d{1,3}(?:[.,]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)\s*'
+    r'(trilh(?:ão|ao|ões|oes)|bilh(?:ão|ao|ões|oes)|milh(?:ão|ao|ões|oes)|trillion|billion|million|tri|bi|mi|bn|mm)\b',
+    re.IGNORECASE
+)
+
+STRONG_KEYWORDS = re.compile(r'sob gest[ãa]o|assets under management|\baum\b|patrim[ôo]nio sob|sob administra[çc][ãa]o')
+
+WEAK_KEYWORDS = re.compile(r'patrim[ôo]nio|gest[ãa]o de|\bativos\b|\bfundos\b|gerencia|administra')
+
+UNIT_ALIASES = {
+    'trillion': 't',
+    'tri': 't',
+    'billion': 'b',
+    'bn': 'b',
+    'million': 'm',
+    'mm': 'm',
+}
+
+
+class HeuristicAumExtractor:
+    def __init__(self, window: int = 120):
+        self.window = window
+
+    def parse_number(self, raw: str) -> float:
+        if ',' in raw and '.' in raw:
+            decimal = ',' if raw.rfind(',') > raw.rfind('.') else '.'
+            thousands = '.' if decimal == ',' else ','
+            return float(raw.replace(thousands, '').replace(decimal, '.'))
+
+        separator = ',' if ',' in raw else '.'
+        parts = raw.split(separator)
+        if len(parts) > 2 or (len(parts) == 2 and len(parts[1]) == 3 and separator == '.'):
+            return float(raw.replace(separator, ''))
+        return float(raw.replace(',', '.'))
+
+    def score(self, context: str, currency: Optional[str]) -> float:
+        score = 0.5
+        if STRONG_KEYWORDS.search(context):
+            score += 0.35
+        elif WEAK_KEYWORDS.search(context):
+            score += 0.15
+        if currency:
+            score += 0.1
+        return score
+
+    def candidates(self, text: str) -> List[Dict[str, Any]]:
+        text_lower = text.lower()
+        found = []
+
+        for match in AMOUNT_PATTERN.finditer(text):
+            currency, raw_value, raw_unit = match.group(1), match.group(2), match.group(3).lower()
+            try:
+                value = self.parse_number(raw_value)
+            except ValueError:
+                continue
+
+            unit = UNIT_ALIASES.get(raw_unit, raw_unit)
+            context = text_lower[max(0, match.start() - self.window):match.end() + self.window]
+            found.append({
+                "currency": currency,
+                "value": value,
+                "unit": unit,
+                "numeric": ai_extractor._convert_to_numeric(value, unit),
+                "score": self.score(context, currency)
+            })
+
+        return found
+
+    def extract(self, text: str, source_url: str) -> Optional[Dict[str, Any]]:
+        found = self.candidates(text)
+        if not found:
+            return None
+
+        best = max(found, key=lambda candidate: candidate["score"])
+        confidence = best["score"]
+
+        rivals = {
+            candidate["numeric"] for candidate in found
+            if candidate["score"] >= best["score"] and candidate["numeric"] != best["numeric"]
+        }
+        if rivals:
+            confidence -= 0.2
+
+        return {
+            "aum_value": f"{best['currency'] or '$'} {best['value']} {best['unit'].upper()}",
+            "aum_numeric": best["numeric"],
+            "aum_unit": best["unit"],
+            "confidence_score": round(min(confidence, 0.95), 2),
+            "is_available": True,
+            "source_url": source_url,
+            "source_type": "heuristic_extraction"
+        }
+
+
+heuristic_extractor = HeuristicAumExtractor()
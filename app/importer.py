@@ -0,0 +1,110 @@
+import asyncio
+import pandas as pd
+from typing import Dict, Any, BinaryIO
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import upsert
+from app.stats import scrape_stats
+from app.models import Company
+
+
+URL_COLUMNS = ["url_site", "url_linkedin", "url_instagram", "url_x"]
+
+COMPANY_COLUMNS = ["name"] + URL_COLUMNS
+
+BARE_HOST_PATTERN = r'(?:[a-z0-9-]+\.)+[a-z]{2,}(?:[/?#:]\S*)?$'
+
+COLUMN_ALIASES = {
+    "empresa": "name",
+    "nome": "name",
+    "site": "url_site",
+    "website": "url_site",
+    "linkedin": "url_linkedin",
+    "instagram": "url_instagram",
+    "x": "url_x",
+    "twitter": "url_x",
+}
+
+class CompanyImporter:
+    def __init__(self, chunk_size: int = None):
+        self.chunk_size = chunk_size or settings.csv_import_chunk_size
+
+    def normalize_columns(self, frame: pd.DataFrame) -> pd.DataFrame:
+        columns = frame.columns.str.strip().str.lower()
+        frame.columns = [COLUMN_ALIASES.get(column, column) for column in columns]
+        if "name" not in frame.columns:
+            raise ValueError("CSV must have a 'name' column")
+        return frame.reindex(columns=COMPANY_COLUMNS).astype(object)
+
+    def clean_chunk(self, frame: pd.DataFrame) -> Dict[str, Any]:
+        frame = self.normalize_columns(frame)
+        for column in COMPANY_COLUMNS:
+            frame[column] = frame[column].str.strip()
+
+        named = frame["name"].notna() & (frame["name"] != "")
+        skipped = int((~named).sum())
+        frame = frame[named].copy()
+
+        invalid_urls = 0
+        for column in URL_COLUMNS:
+            values = frame[column].mask(frame[column] == "")
+            bare_host = values.str.match(BARE_HOST_PATTERN, case=False, na=False)
+            values = values.mask(bare_host, "https://" + values.fillna(""))
+            valid = values.str.match(r'https?://', case=False, na=False)
+            invalid_urls += int((values.notna() & ~valid).sum())
+            frame[column] = values.where(valid)
+
+        deduplicated = frame.drop_duplicates("name", keep="last")
+        duplicates = len(frame) - len(deduplicated)
+
+        rows = deduplicated.astype(object).where(deduplicated.notna(), None).to_dict("records")
+        return {"rows": rows, "skipped": skipped, "duplicates": duplicates, "invalid_urls": invalid_urls}
+
+    def upsert_statement(self, db: AsyncSession):
+        statement = upsert(Company, db)
+        return statement.on_conflict_do_update(
+            index_elements=[Company.name],
+            set_={
+                column: func.coalesce(statement.excluded[column], getattr(Company, column))
+                for column in URL_COLUMNS
+            }
+        )
+
+    async def write_chunk(self, rows, db: AsyncSession) -> int:
+        names = [row["name"] for row in rows]
+        existing = await db.scalar(select(func.count()).select_from(Company).where(Company.name.in_(names)))
+        await db.execute(self.upsert_statement(db), rows)
+        await scrape_stats.increment({"total_companies": len(rows) - existing}, db)
+        await db.commit()
+        return existing
+
+    async def import_csv(self, source: BinaryIO, db: AsyncSession) -> Dict[str, int]:
+        counts = {"rows": 0, "inserted": 0, "updated": 0, "skipped": 0, "duplicates": 0, "invalid_urls": 0}
+
+        try:
+            reader = pd.read_csv(source, chunksize=self.chunk_size, dtype=str, keep_default_na=False, na_values=[""])
+            while True:
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    break
+
+                cleaned = self.clean_chunk(chunk)
+                counts["rows"] += len(chunk)
+                counts["skipped"] += cleaned["skipped"]
+                counts["duplicates"] += cleaned["duplicates"]
+                counts["invalid_urls"] += cleaned["invalid_urls"]
+
+                if cleaned["rows"]:
+                    existing = await self.write_chunk(cleaned["rows"], db)
+                    counts["updated"] += existing
+                    counts["inserted"] += len(cleaned["rows"]) - existing
+
+            return counts
+
+        except Exception as e:
+            await db.rollback()
+            raise Exception(f"Error loading companies from CSV: {e}")
+
+
+company_importer = CompanyImporter()
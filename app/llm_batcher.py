@@ -0,0 +1,126 @@
+import asyncio
+import json
+import re
+from typing import List, Dict, Any, Optional
+from app.config import settings
+from app.budget import budget_governor
+from app.tokenizer import count_tokens, truncate_to_tokens
+
+
+class ExtractionBatcher:
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running = set()
+        self.batches_sent = 0
+        self.fallbacks = 0
+    
+    async def submit(self, company_name: str, content: str) -> str:
+        loop = asyncio.get_running_loop()
+        snippet = truncate_to_tokens(content, self.extractor.content_budget(company_name), self.extractor.model)
+        tokens = count_tokens(company_name) + count_tokens(snippet) + 20
+        
+        if self._pending and self._pending_tokens + tokens > settings.llm_batch_token_budget:
+            self._flush()
+        
+        item = {
+            "company_name": company_name,
+            "content": snippet,
+            "future": loop.create_future()
+        }
+        self._pending.append(item)
+        self._pending_tokens += tokens
+        
+        if self._pending_tokens >= settings.llm_batch_token_budget or len(self._pending) >= settings.llm_batch_max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(settings.llm_batch_linger_seconds, self._flush)
+        
+        return await item["future"]
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        batch = [item for item in batch if not item["future"].done()]
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    def build_messages(self, batch: List[Dict[str, Any]]) -> list:
+        items = "\n\n".join(
+            f"### id={index} | empresa={item['company_name']}\n{item['content']}"
+            for index, item in enumerate(batch)
+        )
+        prompt = (
+            "Para cada item abaixo, identifique o patrimônio sob gestão (AUM) anunciado pela empresa indicada. "
+            "Responda somente com um array JSON no formato "
+            '[{"id": <id>, "aum": "<número e unidade, ex.: R$ 2,3 bi>"}], '
+            'usando "NAO_DISPONIVEL" quando o conteúdo não informar o AUM.\n\n'
+            f"{items}"
+        )
+        return [
+            {"role": "system", "content": self.extractor.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def parse_batch_response(self, response: str, size: int) -> Dict[int, str]:
+        match = re.search(r'\[.*\]', response, re.DOTALL)
+        if not match:
+            return {}
+        
+        try:
+            entries = json.loads(match.group(0))
+        except ValueError:
+            return {}
+        
+        answers = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry.get("id"))
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < size and entry.get("aum") is not None:
+                answers[index] = str(entry["aum"])
+        return answers
+    
+    async def _run(self, batch: List[Dict[str, Any]]):
+        answers = {}
+        if len(batch) > 1:
+            try:
+                response, tokens_used = await self.extractor.complete(self.build_messages(batch), 30 * len(batch) + 50)
+                self.batches_sent += 1
+                await budget_governor.record(tokens_used)
+                answers = self.parse_batch_response(response, len(batch))
+            except Exception:
+                answers = {}
+        
+        fallback = []
+        for index, item in enumerate(batch):
+            if item["future"].done():
+                continue
+            if index in answers:
+                item["future"].set_result(answers[index])
+            else:
+                fallback.append(item)
+        
+        self.fallbacks += len(fallback) if len(batch) > 1 else 0
+        await asyncio.gather(*[self._run_single(item) for item in fallback])
+    
+    async def _run_single(self, item: Dict[str, Any]):
+        try:
+            response = await self.extractor.complete_single(item["company_name"], item["content"])
+        except Exception as e:
+            if not item["future"].done():
+                item["future"].set_exception(e)
+            return
+        
+        if not item["future"].done():
+            item["future"].set_result(response)
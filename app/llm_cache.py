@@ -0,0 +1,99 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import upsert
+from app.models import LlmCache
+
+
+class LlmResponseCache:
+    def __init__(self):
+        self.ttl_seconds = settings.llm_cache_ttl_seconds
+        self.max_entries = settings.llm_cache_max_entries
+        self.memory_entries = settings.llm_cache_memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._writes_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def normalize(self, text: str) -> str:
+        return re.sub(r'\s+', ' ', text).strip().lower()
+    
+    def make_key(self, model: str, messages: List[Dict[str, str]]) -> str:
+        normalized = "\n".join(f"{message['role']}:{self.normalize(message['content'])}" for message in messages)
+        return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+    
+    def _remember(self, key: str, response: str, stored_at: float):
+        self._memory[key] = (response, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    async def get(self, key: str, db: AsyncSession) -> Optional[str]:
+        now = time.time()
+        cached = self._memory.get(key)
+        if cached and now - cached[1] < self.ttl_seconds:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return cached[0]
+        
+        entry = await db.get(LlmCache, key)
+        if entry and entry.created_at >= datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_accessed_at = datetime.utcnow()
+            await db.commit()
+            self._remember(key, entry.response, now - (datetime.utcnow() - entry.created_at).total_seconds())
+            self.hits += 1
+            return entry.response
+        
+        self._memory.pop(key, None)
+        self.misses += 1
+        return None
+    
+    async def put(self, key: str, model: str, response: str, db: AsyncSession):
+        self._remember(key, response, time.time())
+        
+        now = datetime.utcnow()
+        statement = upsert(LlmCache, db)
+        await db.execute(statement.values(
+            key=key, model=model, response=response, hits=0, created_at=now, last_accessed_at=now
+        ).on_conflict_do_update(
+            index_elements=[LlmCache.key],
+            set_={"model": model, "response": response, "created_at": now, "last_accessed_at": now}
+        ))
+        await db.commit()
+        
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= 100:
+            await self.prune(db)
+    
+    async def prune(self, db: AsyncSession):
+        self._writes_since_prune = 0
+        expired_before = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        await db.execute(
+            delete(LlmCache).where(LlmCache.created_at < expired_before).execution_options(synchronize_session=False)
+        )
+        
+        overflow = select(LlmCache.key).order_by(LlmCache.last_accessed_at.desc()).offset(self.max_entries)
+        await db.execute(
+            delete(LlmCache).where(LlmCache.key.in_(overflow.scalar_subquery())).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.llm_cache_enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+
+llm_cache = LlmResponseCache()
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import re
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import openai
+from openai import AsyncOpenAI
+from app.config import settings
+from app.politeness import TokenBucket
+from app.resilience import parse_retry_after
+from app.tokenizer import count_tokens
+
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.in_flight = 0
+        self.successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self, headroom: bool = True):
+        self.successes += 1
+        if headroom and self.successes >= self.limit and self.limit < self.maximum:
+            self.successes = 0
+            async with self._condition:
+                self.limit += 1
+                self._condition.notify_all()
+
+    def on_throttle(self):
+        self.successes = 0
+        self.limit = max(self.minimum, self.limit // 2)
+
+
+class LlmGateway:
+    def __init__(self):
+        self.api_key = settings.openai_api_key
+        self.base_url = settings.openai_base_url or None
+        self.requests_per_minute = settings.llm_requests_per_minute
+        self.tokens_per_minute = settings.llm_tokens_per_minute
+        self.max_retries = settings.llm_max_retries
+        self.backoff_base = settings.llm_backoff_base_seconds
+        self.backoff_max = settings.llm_backoff_max_seconds
+        self._client: Optional[AsyncOpenAI] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._requests: Optional[TokenBucket] = None
+        self._tokens: Optional[TokenBucket] = None
+        self._limiter: Optional[AdaptiveLimiter] = None
+        self._queue_waits = deque(maxlen=1000)
+        self.rate_limit_headers: Dict[str, Any] = {}
+        self.metrics = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "failures": 0,
+            "tokens": 0,
+        }
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=settings.llm_timeout_seconds,
+                max_retries=0
+            )
+            burst = settings.llm_burst_seconds / 60
+            self._requests = TokenBucket(self.requests_per_minute / 60, int(self.requests_per_minute * burst))
+            self._tokens = TokenBucket(self.tokens_per_minute / 60, int(self.tokens_per_minute * burst))
+            self._limiter = AdaptiveLimiter(
+                settings.llm_initial_concurrency,
+                settings.llm_min_concurrency,
+                settings.llm_max_concurrency
+            )
+            self._loop = loop
+
+    def estimate_tokens(self, model: str, messages: List[Dict[str, str]], max_tokens: int) -> int:
+        return sum(count_tokens(message["content"], model) for message in messages) + max_tokens
+
+    def observe(self, headers) -> bool:
+        remaining_requests = parse_int(headers.get("x-ratelimit-remaining-requests"))
+        remaining_tokens = parse_int(headers.get("x-ratelimit-remaining-tokens"))
+        limit_requests = parse_int(headers.get("x-ratelimit-limit-requests"))
+        limit_tokens = parse_int(headers.get("x-ratelimit-limit-tokens"))
+
+        if remaining_requests is not None:
+            self._requests.cap(remaining_requests)
+        if remaining_tokens is not None:
+            self._tokens.cap(remaining_tokens)
+
+        self.rate_limit_headers = {
+            "remaining_requests": remaining_requests,
+            "remaining_tokens": remaining_tokens,
+            "reset_requests_seconds": parse_duration(headers.get("x-ratelimit-reset-requests")),
+            "reset_tokens_seconds": parse_duration(headers.get("x-ratelimit-reset-tokens")),
+        }
+
+        low_requests = remaining_requests is not None and limit_requests and remaining_requests < limit_requests * 0.1
+        low_tokens = remaining_tokens is not None and limit_tokens and remaining_tokens < limit_tokens * 0.1
+        return not (low_requests or low_tokens)
+
+    def retry_after(self, error: openai.APIError) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        milliseconds = response.headers.get("retry-after-ms")
+        try:
+            if milliseconds is not None:
+                return float(milliseconds) / 1000
+        except ValueError:
+            pass
+        return parse_retry_after(response.headers)
+
+    def is_retryable(self, error: openai.APIError) -> bool:
+        if isinstance(error, openai.APIConnectionError):
+            return True
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            return getattr(error, "code", None) != "insufficient_quota"
+        return status is not None and status >= 500
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def complete(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float = 0.1) -> Tuple[str, int]:
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        estimated = self.estimate_tokens(model, messages, max_tokens)
+
+        attempt = 0
+        while True:
+            queued_at = loop.time()
+            await self._requests.acquire()
+            await self._tokens.acquire(estimated)
+            await self._limiter.acquire()
+            self._queue_waits.append(loop.time() - queued_at)
+
+            error = None
+            try:
+                self.metrics["requests"] += 1
+                raw = await self._client.chat.completions.with_raw_response.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+            except openai.APIError as e:
+                error = e
+            finally:
+                await self._limiter.release()
+
+            if error is None:
+                await self._limiter.on_success(self.observe(raw.headers))
+                completion = raw.parse()
+                tokens_used = completion.usage.total_tokens if completion.usage else estimated
+                self.metrics["tokens"] += tokens_used
+                return completion.choices[0].message.content.strip(), tokens_used
+
+            status = getattr(error, "status_code", None)
+            if status == 429:
+                self.metrics["rate_limited"] += 1
+                self._limiter.on_throttle()
+                self._tokens.cap(0)
+            elif status is not None and status >= 500:
+                self.metrics["server_errors"] += 1
+
+            if not self.is_retryable(error) or attempt >= self.max_retries:
+                self.metrics["failures"] += 1
+                raise error
+
+            self.metrics["retries"] += 1
+            await asyncio.sleep(self.backoff(attempt, self.retry_after(error)))
+            attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._queue_waits)
+        return {
+            **self.metrics,
+            "concurrency_limit": self._limiter.limit if self._limiter else settings.llm_initial_concurrency,
+            "in_flight": self._limiter.in_flight if self._limiter else 0,
+            "queue_wait_avg_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "queue_wait_p95_seconds": round(waits[int(len(waits) * 0.95) - 1 if len(waits) > 1 else 0], 3) if waits else 0.0,
+            "queue_wait_max_seconds": round(waits[-1], 3) if waits else 0.0,
+            "rate_limits": self.rate_limit_headers,
+        }
+
+    async def close(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.close()
+        self._client = None
+        self._loop = None
+
+
+llm_gateway = LlmGateway()
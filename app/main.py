@@ -1,88 +1,206 @@
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from typing import List
-import os
-import shutil
+from fastapi.responses import HTMLResponse, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
 from app.database import engine, get_db
-from app.models import Base, Company, AumSnapshot, ScrapeLog, Usage
-from app.schemas import Company as CompanySchema, AumSnapshot as AumSnapshotSchema, ScrapeLog as ScrapeLogSchema, Usage as UsageSchema, ScrapeRequest, ScrapeResponse
+from app.models import Base, Company, AumSnapshot, ScrapeLog, Usage, ScrapeJob
+from app.schemas import CompanyPage, AumSnapshotPage, ScrapeLogPage, Usage as UsageSchema, ScrapeRequest, ScrapeJobResponse, ScrapeJob as ScrapeJobSchema
 from app.services import scraping_service
+from app.importer import company_importer
+from app.exporter import result_exporter, EXPORT_FORMATS
+from app.pagination import keyset_page
+from app.scraper import scraper
+from app.llm_cache import llm_cache
+from app.llm_gateway import llm_gateway
+from app.bulk_writer import bulk_writer
+from app.budget import budget_governor
+from app.stats import scrape_stats
+from app.scheduler import rescrape_scheduler
+from app.progress import sse_event
 
-Base.metadata.create_all(bind=engine)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 app = FastAPI(title="AUM Scraper API", version="1.0.0")
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
+@app.on_event("startup")
+async def startup():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    bulk_writer.start()
+    budget_governor.start()
+    scrape_stats.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await bulk_writer.close()
+    await budget_governor.close()
+    await scrape_stats.close()
+    await scraper.close()
+    await llm_gateway.close()
+    await engine.dispose()
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     with open("app/static/index.html", "r", encoding="utf-8") as f:
         return HTMLResponse(content=f.read())
 
 @app.post("/upload-csv")
-async def upload_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_csv(file: UploadFile = File(...), db: AsyncSession = Depends(get_db)):
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
-    file_path = f"data/{file.filename}"
-    os.makedirs("data", exist_ok=True)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
     try:
-        companies = await scraping_service.load_companies_from_csv(file_path, db)
-        return {"message": f"Successfully loaded {len(companies)} companies", "companies": companies}
+        counts = await company_importer.import_csv(file.file, db)
+        return {"message": f"Successfully loaded {counts['inserted'] + counts['updated']} companies", **counts}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/companies", response_model=List[CompanySchema])
-async def get_companies(db: Session = Depends(get_db)):
-    companies = db.query(Company).all()
-    return companies
+@app.get("/companies", response_model=CompanyPage)
+async def get_companies(
+    name: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(Company)
+    if name:
+        query = query.where(Company.name.ilike(f"%{name}%"))
+    
+    try:
+        return await keyset_page(db, query, [Company.id], cursor, limit, descending=False)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/scrape", response_model=ScrapeResponse)
-async def start_scraping(request: ScrapeRequest, db: Session = Depends(get_db)):
+@app.post("/scrape", response_model=ScrapeJobResponse)
+async def start_scraping(request: ScrapeRequest, db: AsyncSession = Depends(get_db)):
     try:
-        result = await scraping_service.scrape_companies(request.company_ids, db)
-        return result
+        job = await scraping_service.create_scrape_job(request.company_ids, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-@app.get("/scrape/status")
-async def get_scrape_status(db: Session = Depends(get_db)):
-    total_companies = db.query(Company).count()
-    companies_with_aum = db.query(AumSnapshot).distinct(AumSnapshot.company_id).count()
-    total_scrapes = db.query(ScrapeLog).count()
-    successful_scrapes = db.query(ScrapeLog).filter(ScrapeLog.status == "success").count()
     
-    success_rate = (successful_scrapes / total_scrapes * 100) if total_scrapes > 0 else 0
+    if not job.total_companies:
+        return {"message": "No companies found to scrape", "job_id": job.id, "status": job.status, "total_companies": 0}
     
     return {
-        "total_companies": total_companies,
-        "companies_with_aum": companies_with_aum,
-        "total_scrapes": total_scrapes,
-        "successful_scrapes": successful_scrapes,
-        "success_rate": round(success_rate, 1)
+        "message": f"Scraping queued for {job.total_companies} companies (job {job.id})",
+        "job_id": job.id,
+        "status": job.status,
+        "total_companies": job.total_companies
     }
 
-@app.get("/aum-snapshots", response_model=List[AumSnapshotSchema])
-async def get_aum_snapshots(db: Session = Depends(get_db)):
-    snapshots = db.query(AumSnapshot).order_by(AumSnapshot.created_at.desc()).all()
-    return snapshots
+@app.get("/scrape/jobs/{job_id}", response_model=ScrapeJobSchema)
+async def get_scrape_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ScrapeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
-@app.get("/scrape-logs", response_model=List[ScrapeLogSchema])
-async def get_scrape_logs(db: Session = Depends(get_db)):
-    logs = db.query(ScrapeLog).order_by(ScrapeLog.created_at.desc()).limit(100).all()
-    return logs
+@app.get("/scrape/jobs/{job_id}/results")
+async def get_scrape_job_results(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(ScrapeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "completed_companies": job.completed_companies,
+        "total_companies": job.total_companies,
+        "results": await scraping_service.get_job_results(job_id, db)
+    }
+
+@app.get("/scrape/jobs/{job_id}/events")
+async def stream_scrape_job_events(job_id: str, db: AsyncSession = Depends(get_db)):
+    if not await db.get(ScrapeJob, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        async for event in scraping_service.iter_job_progress(job_id):
+            yield sse_event(event, event["type"])
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/scrape/schedule")
+async def preview_rescrape_schedule(db: AsyncSession = Depends(get_db)):
+    return await rescrape_scheduler.plan(db)
+
+@app.post("/scrape/schedule")
+async def run_rescrape_schedule():
+    try:
+        return await rescrape_scheduler.run_cycle()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/scrape/status")
+async def get_scrape_status(db: AsyncSession = Depends(get_db)):
+    return scrape_stats.summarize(await scrape_stats.read(db))
+
+@app.get("/aum-snapshots", response_model=AumSnapshotPage)
+async def get_aum_snapshots(
+    company_id: Optional[int] = None,
+    source_type: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(AumSnapshot)
+    if company_id is not None:
+        query = query.where(AumSnapshot.company_id == company_id)
+    if source_type:
+        query = query.where(AumSnapshot.source_type == source_type)
+    if is_available is not None:
+        query = query.where(AumSnapshot.is_available == is_available)
+    if created_after:
+        query = query.where(AumSnapshot.created_at >= created_after)
+    if created_before:
+        query = query.where(AumSnapshot.created_at < created_before)
+    
+    try:
+        return await keyset_page(db, query, [AumSnapshot.created_at, AumSnapshot.id], cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/scrape-logs", response_model=ScrapeLogPage)
+async def get_scrape_logs(
+    company_id: Optional[int] = None,
+    status: Optional[str] = None,
+    error_class: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(ScrapeLog)
+    if company_id is not None:
+        query = query.where(ScrapeLog.company_id == company_id)
+    if status:
+        query = query.where(ScrapeLog.status == status)
+    if error_class:
+        query = query.where(ScrapeLog.error_class == error_class)
+    if created_after:
+        query = query.where(ScrapeLog.created_at >= created_after)
+    if created_before:
+        query = query.where(ScrapeLog.created_at < created_before)
+    
+    try:
+        return await keyset_page(db, query, [ScrapeLog.created_at, ScrapeLog.id], cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/usage/today", response_model=UsageSchema)
-async def get_today_usage(db: Session = Depends(get_db)):
+async def get_today_usage(db: AsyncSession = Depends(get_db)):
     from datetime import date
     today = date.today()
-    usage = db.query(Usage).filter(Usage.date >= today).first()
+    await budget_governor.flush()
+    usage = await db.scalar(select(Usage).where(Usage.date >= today).limit(1))
     
     if not usage:
         usage = Usage(
@@ -92,27 +210,53 @@ async def get_today_usage(db: Session = Depends(get_db)):
             requests_count=0
         )
         db.add(usage)
-        db.commit()
-        db.refresh(usage)
+        await db.commit()
+        await db.refresh(usage)
     
     return usage
 
-@app.get("/export/excel")
-async def export_excel(db: Session = Depends(get_db)):
-    try:
-        output_path = scraping_service.export_to_excel(db)
-        return FileResponse(
-            path=output_path,
-            filename="aum_results.xlsx",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error exporting to Excel: {e}")
+@app.get("/fetch/stats")
+async def get_fetch_stats():
+    return scraper.resilience.stats()
+
+@app.get("/llm/stats")
+async def get_llm_stats():
+    return llm_gateway.stats()
+
+@app.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    return llm_cache.stats()
+
+@app.get("/export/{export_format}")
+async def export_results(
+    export_format: str,
+    company_ids: Optional[List[int]] = Query(None),
+    only_with_aum: bool = False,
+    min_confidence: Optional[float] = None,
+    source_type: Optional[str] = None,
+    updated_since: Optional[datetime] = None
+):
+    export_format = "xlsx" if export_format == "excel" else export_format
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    filters = {
+        "company_ids": company_ids,
+        "only_with_aum": only_with_aum,
+        "min_confidence": min_confidence,
+        "source_type": source_type,
+        "updated_since": updated_since
+    }
+    return StreamingResponse(
+        result_exporter.stream(export_format, filters),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="aum_results.{export_format}"'}
+    )
 
 @app.post("/rescrape/{company_id}")
-async def rescrape_company(company_id: int, db: Session = Depends(get_db)):
+async def rescrape_company(company_id: int):
     try:
-        result = await scraping_service.scrape_companies([company_id], db)
+        result = await scraping_service.scrape_companies([company_id])
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -9,7 +9,7 @@ class Company(Base):
     __tablename__ = "companies"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, unique=True, index=True)
     url_site = Column(String, nullable=True)
     url_linkedin = Column(String, nullable=True)
     url_instagram = Column(String, nullable=True)
@@ -21,19 +21,41 @@ class Company(Base):
 
 class ScrapeLog(Base):
     __tablename__ = "scrape_logs"
+    __table_args__ = (
+        Index("ix_scrape_logs_company_created", "company_id", "created_at", "id"),
+        Index("ix_scrape_logs_created", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"))
     url = Column(String, nullable=False)
+    source_type = Column(String, nullable=True)
     status = Column(String, nullable=False)
     content_length = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
+    error_class = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     company = relationship("Company", back_populates="scrape_logs")
 
+class PageCache(Base):
+    __tablename__ = "page_cache"
+    __table_args__ = (UniqueConstraint("company_id", "url", name="uq_page_cache_company_url"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    url = Column(String, nullable=False)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class AumSnapshot(Base):
     __tablename__ = "aum_snapshots"
+    __table_args__ = (
+        Index("ix_aum_snapshots_company_created", "company_id", "created_at", "id"),
+        Index("ix_aum_snapshots_created", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id"))
@@ -48,6 +70,30 @@ class AumSnapshot(Base):
     
     company = relationship("Company", back_populates="aum_snapshots")
 
+class LlmCache(Base):
+    __tablename__ = "llm_cache"
+    
+    key = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ScrapeStat(Base):
+    __tablename__ = "scrape_stats"
+    
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class FetchStrategy(Base):
+    __tablename__ = "fetch_strategies"
+    
+    domain = Column(String, primary_key=True)
+    strategy = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Usage(Base):
     __tablename__ = "usage"
     
@@ -56,3 +102,30 @@ class Usage(Base):
     total_tokens = Column(Integer, default=0)
     cost_usd = Column(Float, default=0.0)
     requests_count = Column(Integer, default=0)
+
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+    
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="queued")
+    total_companies = Column(Integer, default=0)
+    completed_companies = Column(Integer, default=0)
+    successful_scrapes = Column(Integer, default=0)
+    failed_scrapes = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    items = relationship("ScrapeJobItem", back_populates="job")
+
+class ScrapeJobItem(Base):
+    __tablename__ = "scrape_job_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, ForeignKey("scrape_jobs.id"), nullable=False, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")
+    aum_found = Column(Boolean, default=False)
+    result = Column(Text, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    job = relationship("ScrapeJob", back_populates="items")
@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.bulk_writer import bulk_writer
+from app.models import PageCache, AumSnapshot
+
+
+class PageCacheStore:
+    def hash_content(self, content: str) -> str:
+        return hashlib.sha256(content.encode('utf-8', errors='replace')).hexdigest()
+    
+    async def get(self, company_id: int, url: str, db: AsyncSession) -> Optional[PageCache]:
+        return await db.scalar(select(PageCache).where(
+            PageCache.company_id == company_id,
+            PageCache.url == url
+        ))
+    
+    def conditional_headers(self, entry: Optional[PageCache]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+    
+    def is_unchanged(self, entry: Optional[PageCache], status_code: int, content_hash: Optional[str]) -> bool:
+        if entry is None:
+            return False
+        if status_code == 304:
+            return True
+        return content_hash is not None and entry.content_hash == content_hash
+    
+    def store(self, company_id: int, url: str, headers: Dict[str, str], content_hash: str):
+        bulk_writer.add(PageCache, {
+            "company_id": company_id,
+            "url": url,
+            "etag": headers.get('etag'),
+            "last_modified": headers.get('last-modified'),
+            "content_hash": content_hash,
+            "fetched_at": datetime.utcnow()
+        })
+    
+    async def last_snapshot(self, company_id: int, url: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
+        snapshot = await db.scalar(select(AumSnapshot).where(
+            AumSnapshot.company_id == company_id,
+            AumSnapshot.source_url == url
+        ).order_by(AumSnapshot.created_at.desc()).limit(1))
+        
+        if not snapshot:
+            return None
+        
+        return {
+            "aum_value": snapshot.aum_value,
+            "aum_numeric": snapshot.aum_numeric,
+            "aum_unit": snapshot.aum_unit,
+            "confidence_score": snapshot.confidence_score,
+            "is_available": snapshot.is_available,
+            "source_url": snapshot.source_url,
+            "source_type": snapshot.source_type,
+            "cached": True
+        }
+
+    
+    async def snapshot_urls(self, company_id: int, db: AsyncSession, limit: int) -> List[str]:
+        return list((await db.scalars(select(AumSnapshot.source_url).where(
+            AumSnapshot.company_id == company_id,
+            AumSnapshot.source_url.isnot(None)
+        ).group_by(AumSnapshot.source_url).order_by(func.max(AumSnapshot.created_at).desc()).limit(limit))).all())
+
+
+page_cache = PageCacheStore()
@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: List[Any]) -> str:
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) and value is not None else value
+            for value, column in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+async def keyset_page(db: AsyncSession, query, columns, cursor: Optional[str], limit: int, descending: bool = True) -> Dict[str, Any]:
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        bound = tuple_(*[literal(value, column.type) for value, column in zip(values, columns)])
+        query = query.where(key < bound if descending else key > bound)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns]).limit(limit + 1)
+    items = list((await db.scalars(query)).all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+
+    return {"items": items, "next_cursor": next_cursor}
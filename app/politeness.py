@@ -0,0 +1,78 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from app.config import settings
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = asyncio.get_running_loop().time()
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                self._refill(loop.time())
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def cap(self, available: float):
+        self._refill(asyncio.get_running_loop().time())
+        self.tokens = min(self.tokens, max(available, 0.0))
+
+
+class DomainState:
+    def __init__(self, rate: float, burst: int, max_inflight: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(max_inflight)
+
+
+class DomainScheduler:
+    def __init__(self):
+        self._domains: Dict[str, DomainState] = {}
+        self._global: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def domain_for(url: str) -> str:
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+
+    def rate_for(self, domain: str) -> float:
+        for suffix, rate in settings.domain_rate_overrides.items():
+            if domain == suffix or domain.endswith('.' + suffix):
+                return rate
+        return settings.domain_requests_per_second
+
+    def _state(self, domain: str) -> DomainState:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._domains = {}
+            self._global = asyncio.Semaphore(settings.global_max_inflight)
+            self._loop = loop
+
+        state = self._domains.get(domain)
+        if state is None:
+            state = DomainState(self.rate_for(domain), settings.domain_burst, settings.domain_max_inflight)
+            self._domains[domain] = state
+        return state
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        state = self._state(self.domain_for(url))
+        async with state.semaphore:
+            await state.bucket.acquire()
+            async with self._global:
+                yield
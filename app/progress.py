@@ -0,0 +1,139 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+from app.config import settings
+
+
+def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    snapshots = result.get("aum_snapshots") or []
+    best = max(snapshots, key=lambda snapshot: snapshot.get("confidence_score") or 0, default=None)
+    return {
+        "company_id": result.get("company_id"),
+        "company_name": result.get("company_name"),
+        "aum_found": bool(result.get("aum_found")),
+        "aum_value": best.get("aum_value") if best else None,
+        "error": result.get("error")
+    }
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    payload = json.dumps(data, default=str)
+    return f"event: {event}\ndata: {payload}\n\n" if event else f"data: {payload}\n\n"
+
+
+class ProgressTracker:
+    def __init__(self, total: int, completed: int = 0, successful: int = 0, failed: int = 0,
+                 started_at: Optional[datetime] = None):
+        self.total = total
+        self.completed = completed
+        self.successful = successful
+        self.failed = failed
+        self.started_at = started_at or datetime.utcnow()
+
+    @classmethod
+    def from_job(cls, job) -> "ProgressTracker":
+        return cls(
+            job.total_companies or 0,
+            job.completed_companies or 0,
+            job.successful_scrapes or 0,
+            job.failed_scrapes or 0,
+            job.created_at
+        )
+
+    def record(self, result: Dict[str, Any]):
+        self.completed += 1
+        if result.get("aum_found"):
+            self.successful += 1
+        else:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = max((datetime.utcnow() - self.started_at).total_seconds(), 0.0)
+        throughput = self.completed / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.total - self.completed, 0)
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "successful": self.successful,
+            "failed": self.failed,
+            "remaining": remaining,
+            "elapsed_seconds": round(elapsed, 1),
+            "throughput_per_minute": round(throughput * 60, 2),
+            "eta_seconds": round(remaining / throughput, 1) if throughput else None,
+            "done": self.completed >= self.total
+        }
+
+
+class MemoryProgressBroker:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+
+        async def receive(timeout: float) -> Optional[Dict[str, Any]]:
+            try:
+                return await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+        try:
+            yield receive
+        finally:
+            subscribers = self._subscribers.get(channel)
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+
+class RedisProgressBroker:
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+            self._loop = loop
+        return self._client
+
+    def key(self, channel: str) -> str:
+        return f"scrape_progress:{channel}"
+
+    async def publish(self, channel: str, event: Dict[str, Any]):
+        await self.client().publish(self.key(channel), json.dumps(event, default=str))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        pubsub = self.client().pubsub()
+        await pubsub.subscribe(self.key(channel))
+
+        async def receive(timeout: float) -> Optional[Dict[str, Any]]:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+            return json.loads(message["data"]) if message else None
+
+        try:
+            yield receive
+        finally:
+            await pubsub.unsubscribe(self.key(channel))
+            await pubsub.close()
+
+
+progress_broker = (
+    RedisProgressBroker(settings.redis_url) if settings.progress_redis_enabled
+    else MemoryProgressBroker(settings.progress_queue_size)
+)
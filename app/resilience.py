@@ -0,0 +1,185 @@
+import asyncio
+import random
+import socket
+import time
+from typing import Dict, Optional, Tuple
+import aiohttp
+from app.config import settings
+
+ERROR_CLASS_HEADER = "x-error-class"
+
+RETRYABLE_CLASSES = {"timeout", "connection", "rate_limited", "http_5xx"}
+HOST_FAILURE_CLASSES = {"dns", "connect_timeout", "timeout", "connection", "rate_limited", "http_5xx"}
+NEGATIVE_CACHE_CLASSES = {"dns", "connect_timeout"}
+TRANSIENT_DNS_ERRORS = {socket.EAI_AGAIN}
+
+BROWSER_ERROR_CLASSES = [
+    ("net::ERR_NAME_NOT_RESOLVED", "dns"),
+    ("net::ERR_CERT", "ssl"),
+    ("net::ERR_SSL", "ssl"),
+    ("net::ERR_CONNECTION", "connection"),
+    ("net::ERR_ADDRESS_UNREACHABLE", "connection"),
+    ("net::ERR_TIMED_OUT", "timeout"),
+    ("Timeout", "timeout"),
+]
+
+
+class FetchError(Exception):
+    def __init__(self, message: str, error_class: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.error_class = error_class
+        self.retry_after = retry_after
+
+
+def status_error_class(status: int) -> str:
+    if status == 429:
+        return "rate_limited"
+    if status >= 500:
+        return "http_5xx"
+    return "http_4xx"
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def retry_after_for(e: Exception) -> Optional[float]:
+    if isinstance(e, FetchError):
+        return e.retry_after
+    if isinstance(e, aiohttp.ClientResponseError):
+        return parse_retry_after(e.headers)
+    return None
+
+
+def classify_exception(e: Exception) -> str:
+    if isinstance(e, FetchError):
+        return e.error_class
+    if isinstance(e, aiohttp.ClientResponseError):
+        return status_error_class(e.status)
+    if isinstance(e, aiohttp.ClientSSLError):
+        return "ssl"
+    if isinstance(e, aiohttp.ClientConnectorError):
+        if isinstance(e.os_error, socket.gaierror) and e.os_error.errno not in TRANSIENT_DNS_ERRORS:
+            return "dns"
+        return "connection"
+    if isinstance(e, asyncio.TimeoutError):
+        return "connect_timeout" if "Connection timeout" in str(e) else "timeout"
+    if isinstance(e, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError, aiohttp.ClientPayloadError)):
+        return "connection"
+
+    message = str(e)
+    for marker, error_class in BROWSER_ERROR_CLASSES:
+        if marker in message:
+            return error_class
+    return "unknown"
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def release_probe(self):
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+class FetchResilience:
+    def __init__(self):
+        self.max_retries = settings.fetch_max_retries
+        self.backoff_base = settings.fetch_backoff_base_seconds
+        self.backoff_max = settings.fetch_backoff_max_seconds
+        self.negative_ttl = settings.negative_dns_ttl_seconds
+        self.negative_threshold = settings.negative_dns_threshold
+        self._negative: Dict[str, Tuple[str, str, float]] = {}
+        self._negative_failures: Dict[str, int] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, domain: str) -> CircuitBreaker:
+        breaker = self._breakers.get(domain)
+        if breaker is None:
+            breaker = CircuitBreaker(settings.circuit_breaker_threshold, settings.circuit_breaker_reset_seconds)
+            self._breakers[domain] = breaker
+        return breaker
+
+    def check(self, domain: str) -> bool:
+        cached = self._negative.get(domain)
+        if cached is not None:
+            error_class, message, expires_at = cached
+            if time.monotonic() < expires_at:
+                raise FetchError(f"{message} (cached)", error_class)
+            del self._negative[domain]
+
+        breaker = self.breaker(domain)
+        probe = breaker.state == "half_open"
+        if not breaker.allow():
+            raise FetchError(f"Circuit open for {domain}", "circuit_open")
+        return probe
+
+    def release_probe(self, domain: str):
+        self.breaker(domain).release_probe()
+
+    def record_success(self, domain: str):
+        self._negative_failures.pop(domain, None)
+        self.breaker(domain).record_success()
+
+    def record_failure(self, domain: str, error_class: str, message: str):
+        if error_class in NEGATIVE_CACHE_CLASSES:
+            failures = self._negative_failures.get(domain, 0) + 1
+            if failures >= self.negative_threshold:
+                self._negative[domain] = (error_class, message, time.monotonic() + self.negative_ttl)
+                failures = 0
+            self._negative_failures[domain] = failures
+        if error_class in HOST_FAILURE_CLASSES:
+            self.breaker(domain).record_failure()
+        else:
+            self.breaker(domain).record_success()
+
+    def should_retry(self, error_class: str, attempt: int) -> bool:
+        return error_class in RETRYABLE_CLASSES and attempt < self.max_retries
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def stats(self) -> Dict[str, int]:
+        now = time.monotonic()
+        return {
+            "negative_cached_domains": sum(1 for _, _, expires_at in self._negative.values() if expires_at > now),
+            "open_circuits": sum(1 for breaker in self._breakers.values() if breaker.state != "closed"),
+        }
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import select, func, distinct, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Company, ScrapeLog, AumSnapshot, ScrapeJobItem
+
+SOURCE_COLUMNS = {
+    "website": "url_site",
+    "linkedin": "url_linkedin",
+    "instagram": "url_instagram",
+    "x": "url_x",
+}
+
+
+class RescrapeScheduler:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.base_interval = timedelta(hours=settings.rescrape_base_interval_hours)
+        self.min_interval = timedelta(hours=settings.rescrape_min_interval_hours)
+        self.retry_base = timedelta(hours=settings.rescrape_retry_base_hours)
+        self.volatility_weight = settings.rescrape_volatility_weight
+        self.source_weights = settings.rescrape_source_weights
+        self.max_fetches = settings.rescrape_max_fetches_per_cycle
+        self.max_llm_tokens = settings.rescrape_max_llm_tokens_per_cycle
+        self.tokens_per_fetch = settings.max_tokens_per_request
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    def history_query(self):
+        snapshots = select(
+            AumSnapshot.company_id,
+            func.max(AumSnapshot.created_at).label("last_snapshot_at"),
+            func.count().label("snapshots"),
+            func.count(distinct(AumSnapshot.aum_numeric)).label("distinct_values")
+        ).group_by(AumSnapshot.company_id).subquery()
+
+        successes = select(
+            ScrapeLog.company_id,
+            func.max(ScrapeLog.created_at).label("last_success_at")
+        ).where(ScrapeLog.status == "success").group_by(ScrapeLog.company_id).subquery()
+
+        entry_fetch = or_(*(
+            and_(ScrapeLog.source_type == source, ScrapeLog.url == getattr(Company, column))
+            for source, column in SOURCE_COLUMNS.items()
+        ))
+
+        source_successes = select(
+            ScrapeLog.company_id,
+            ScrapeLog.source_type,
+            func.max(ScrapeLog.created_at).label("last_success_at")
+        ).join(
+            Company, Company.id == ScrapeLog.company_id
+        ).where(
+            entry_fetch, ScrapeLog.status == "success"
+        ).group_by(ScrapeLog.company_id, ScrapeLog.source_type).subquery()
+
+        source_failures = select(
+            ScrapeLog.company_id,
+            ScrapeLog.source_type,
+            func.count().label("failure_streak"),
+            func.max(ScrapeLog.created_at).label("last_failure_at")
+        ).join(
+            Company, Company.id == ScrapeLog.company_id
+        ).outerjoin(
+            source_successes, and_(
+                source_successes.c.company_id == ScrapeLog.company_id,
+                source_successes.c.source_type == ScrapeLog.source_type
+            )
+        ).where(
+            entry_fetch,
+            ScrapeLog.status != "success",
+            or_(source_successes.c.last_success_at.is_(None), ScrapeLog.created_at > source_successes.c.last_success_at)
+        ).group_by(ScrapeLog.company_id, ScrapeLog.source_type).subquery()
+
+        failures = select(
+            source_failures.c.company_id,
+            func.min(source_failures.c.failure_streak).label("failure_streak"),
+            func.count().label("failing_sources"),
+            func.max(source_failures.c.last_failure_at).label("last_failure_at")
+        ).group_by(source_failures.c.company_id).subquery()
+
+        in_flight = select(ScrapeJobItem.company_id).where(ScrapeJobItem.status == "queued")
+
+        return select(
+            Company.id,
+            Company.name,
+            Company.url_site,
+            Company.url_linkedin,
+            Company.url_instagram,
+            Company.url_x,
+            snapshots.c.last_snapshot_at,
+            snapshots.c.snapshots,
+            snapshots.c.distinct_values,
+            successes.c.last_success_at,
+            failures.c.failure_streak,
+            failures.c.failing_sources,
+            failures.c.last_failure_at,
+        ).outerjoin(
+            snapshots, snapshots.c.company_id == Company.id
+        ).outerjoin(
+            successes, successes.c.company_id == Company.id
+        ).outerjoin(
+            failures, failures.c.company_id == Company.id
+        ).where(
+            Company.id.not_in(in_flight)
+        )
+
+    def volatility(self, row) -> float:
+        snapshots = row.snapshots or 0
+        if snapshots < 2:
+            return 0.0
+        return max((row.distinct_values or 1) - 1, 0) / (snapshots - 1)
+
+    def refresh_interval(self, volatility: float) -> timedelta:
+        return max(self.base_interval / (1 + self.volatility_weight * volatility), self.min_interval)
+
+    def assess(self, row, now: datetime) -> Optional[Dict[str, Any]]:
+        sources = [source for source, column in SOURCE_COLUMNS.items() if getattr(row, column)]
+        if not sources:
+            return None
+
+        failure_streak = (row.failure_streak or 0) if (row.failing_sources or 0) >= len(sources) else 0
+        if failure_streak and row.last_failure_at:
+            retry_after = self.retry_base * 2 ** min(failure_streak - 1, 6)
+            if now - row.last_failure_at < retry_after:
+                return None
+
+        checked = [moment for moment in (row.last_snapshot_at, row.last_success_at) if moment]
+        volatility = self.volatility(row)
+        interval = self.refresh_interval(volatility)
+        source_weight = max(self.source_weights.get(source, 1.0) for source in sources)
+
+        if checked:
+            age = now - max(checked)
+            staleness = age / interval
+            if staleness < 1:
+                return None
+            priority = staleness * source_weight / (1 + failure_streak)
+        else:
+            age = None
+            priority = None
+
+        return {
+            "company_id": row.id,
+            "company_name": row.name,
+            "sources": sources,
+            "age_hours": round(age.total_seconds() / 3600, 1) if age is not None else None,
+            "refresh_interval_hours": round(interval.total_seconds() / 3600, 1),
+            "volatility": round(volatility, 3),
+            "failure_streak": failure_streak,
+            "priority": round(priority, 3) if priority is not None else None,
+            "fetches": len(sources),
+            "llm_tokens": len(sources) * self.tokens_per_fetch,
+        }
+
+    async def plan(self, db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.utcnow()
+        rows = (await db.execute(self.history_query())).all()
+
+        due = [candidate for candidate in (self.assess(row, now) for row in rows) if candidate]
+        due.sort(key=lambda candidate: (
+            candidate["priority"] is None,
+            candidate["priority"] or 0,
+            -candidate["company_id"]
+        ), reverse=True)
+
+        selected = []
+        fetches = 0
+        llm_tokens = 0
+        for candidate in due:
+            if fetches + candidate["fetches"] > self.max_fetches:
+                continue
+            if llm_tokens + candidate["llm_tokens"] > self.max_llm_tokens:
+                continue
+            selected.append(candidate)
+            fetches += candidate["fetches"]
+            llm_tokens += candidate["llm_tokens"]
+
+        return {
+            "companies": len(rows),
+            "due": len(due),
+            "selected": selected,
+            "fetches": fetches,
+            "llm_tokens": llm_tokens,
+        }
+
+    async def run_cycle(self) -> Dict[str, Any]:
+        from app.services import scraping_service
+
+        async with self._session() as db:
+            plan = await self.plan(db)
+            company_ids = [candidate["company_id"] for candidate in plan["selected"]]
+            job = await scraping_service.create_scrape_job(company_ids, db) if company_ids else None
+
+        return {
+            "job_id": job.id if job else None,
+            "companies": plan["companies"],
+            "due": plan["due"],
+            "scheduled": len(company_ids),
+            "fetches": plan["fetches"],
+            "llm_tokens": plan["llm_tokens"],
+        }
+
+
+rescrape_scheduler = RescrapeScheduler()
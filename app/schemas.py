@@ -42,9 +42,11 @@ class AumSnapshot(AumSnapshotBase):
 class ScrapeLogBase(BaseModel):
     company_id: int
     url: str
+    source_type: Optional[str] = None
     status: str
     content_length: int = 0
     error_message: Optional[str] = None
+    error_class: Optional[str] = None
 
 class ScrapeLogCreate(ScrapeLogBase):
     pass
@@ -68,6 +70,18 @@ class Usage(UsageBase):
     class Config:
         from_attributes = True
 
+class CompanyPage(BaseModel):
+    items: List[Company]
+    next_cursor: Optional[str] = None
+
+class AumSnapshotPage(BaseModel):
+    items: List[AumSnapshot]
+    next_cursor: Optional[str] = None
+
+class ScrapeLogPage(BaseModel):
+    items: List[ScrapeLog]
+    next_cursor: Optional[str] = None
+
 class ScrapeRequest(BaseModel):
     company_ids: Optional[List[int]] = None
 
@@ -84,3 +98,22 @@ class CompanyResult(BaseModel):
     scraped_urls: List[dict]
     aum_found: bool
     aum_snapshots: List[dict]
+
+class ScrapeJobResponse(BaseModel):
+    message: str
+    job_id: Optional[str] = None
+    status: str
+    total_companies: int
+
+class ScrapeJob(BaseModel):
+    id: str
+    status: str
+    total_companies: int
+    completed_companies: int
+    successful_scrapes: int
+    failed_scrapes: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -1,96 +1,273 @@
 import asyncio
 import re
-import requests
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright
-from typing import Tuple, Optional
+from lxml import etree
+from lxml import html as lxml_html
+from typing import Tuple, Optional, Dict, List
+from app.config import settings
+from app.fetcher import HttpFetcher
+from app.browser_pool import BrowserPool
+from app.politeness import DomainScheduler
+from app.resilience import FetchResilience, FetchError, ERROR_CLASS_HEADER, classify_exception, retry_after_for, status_error_class
+from app.fetch_strategy import fetch_strategies, STATIC, BROWSER
+from app.tokenizer import count_tokens, truncate_to_tokens
+
+
+DROPPED_TAGS = ["script", "style", "nav", "header", "footer"]
+
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "main", "aside", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "address", "figcaption", "form", "br", "hr",
+]
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+MAX_PARAGRAPH_CHARS = 600
+
+AUM_KEYWORDS = [
+    'aum', 'assets under management', 'patrimônio sob gestão',
+    'patrimonio sob gestao', 'gestão de ativos', 'gestao de ativos',
+    'fundo', 'fundos', 'investimento', 'investimentos',
+    'capital', 'ativo', 'ativos', 'portfólio', 'portfolio',
+    'bilhões', 'bilhoes', 'milhões', 'milhoes', 'bi', 'mi', 'k', 'trilhões', 'trilhoes'
+]
+
+KEYWORD_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in sorted(AUM_KEYWORDS, key=len, reverse=True)))
+
+CURRENCY_PATTERN = re.compile(
+    r'[R$US$€£¥]?\s*\d+[,.]?\d*\s*(?:bi|bilh[ãa]o|mi|milh[ãa]o|mil|k|milh[ãa]os|bilh[ãa]os|trilh[ãa]o|trilh[ãa]os|B|M|K|T)',
+    re.IGNORECASE
+)
+
+AUM_PHRASE_PATTERN = re.compile(r'sob gest[ãa]o|sob administra[çc][ãa]o|assets under management|\baum\b|patrim[ôo]nio')
+
+XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+SPA_ROOT_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>|<app-root|ng-version=|data-reactroot|'
+    r'enable javascript|ativar? o javascript',
+    re.IGNORECASE
+)
+
+TEXT_DOM_SCRIPT = """() => {
+    const root = (document.body || document.documentElement).cloneNode(true);
+    root.querySelectorAll(
+        'script, style, noscript, template, svg, canvas, iframe, img, picture, video, audio, source, link, meta'
+    ).forEach((element) => element.remove());
+    for (const element of root.querySelectorAll('*')) {
+        for (const name of element.getAttributeNames()) {
+            if (name !== 'href') {
+                element.removeAttribute(name);
+            }
+        }
+    }
+    const title = document.createElement('title');
+    title.textContent = document.title;
+    return '<html><head>' + title.outerHTML + '</head><body>' + root.innerHTML + '</body></html>';
+}"""
 
 
 class WebScraper:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.fetcher = HttpFetcher()
+        self.browser_pool = BrowserPool()
+        self.scheduler = DomainScheduler()
+        self.resilience = FetchResilience()
     
     def should_use_playwright(self, url: str) -> bool:
         social_media_domains = ['instagram.com', 'twitter.com', 'x.com', 'facebook.com', 'linkedin.com']
         return any(domain in url.lower() for domain in social_media_domains)
     
     async def scrape_url(self, url: str, use_playwright: bool = False) -> Tuple[str, int, str]:
+        content, status_code, error_message, _ = await self.fetch_page(url, use_playwright)
+        return content, status_code, error_message
+    
+    async def fetch_page(self, url: str, use_playwright: bool = False, headers: Optional[Dict[str, str]] = None) -> Tuple[str, int, str, Dict[str, str]]:
+        domain = DomainScheduler.domain_for(url)
         try:
-            if use_playwright:
-                return await self._scrape_with_playwright(url)
-            else:
-                return await self._scrape_with_requests(url)
-        except Exception as e:
-            return "", 0, str(e)
+            probe = self.resilience.check(domain)
+        except FetchError as e:
+            return "", 0, str(e), {ERROR_CLASS_HEADER: e.error_class}
+        
+        attempt = 0
+        try:
+            while True:
+                try:
+                    async with self.scheduler.slot(url):
+                        if use_playwright:
+                            content, status_code = await self._scrape_with_playwright(url)
+                            response_headers = {}
+                        else:
+                            content, status_code, response_headers = await self._scrape_with_requests(url, headers)
+                    self.resilience.record_success(domain)
+                    return content, status_code, "", response_headers
+                except Exception as e:
+                    error_class = classify_exception(e)
+                    if not self.resilience.should_retry(error_class, attempt):
+                        self.resilience.record_failure(domain, error_class, str(e))
+                        return "", 0, str(e), {ERROR_CLASS_HEADER: error_class}
+                    await asyncio.sleep(self.resilience.backoff(attempt, retry_after_for(e)))
+                    attempt += 1
+        except BaseException:
+            if probe:
+                self.resilience.release_probe(domain)
+            raise
     
-    async def _scrape_with_requests(self, url: str) -> Tuple[str, int, str]:
+    def visible_text(self, html: str) -> str:
+        if not html:
+            return ""
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text, response.status_code, ""
-        except Exception as e:
-            return "", 0, str(e)
+            return ' '.join(self.html_to_text(html).split())
+        except Exception:
+            return ""
     
-    async def _scrape_with_playwright(self, url: str) -> Tuple[str, int, str]:
+    def is_shell(self, html: str, text: str) -> bool:
+        return not text or (len(text) < settings.static_min_text_chars and bool(SPA_ROOT_PATTERN.search(html)))
+    
+    def has_signal(self, html: str) -> bool:
+        text = self.visible_text(html)
+        if self.is_shell(html, text):
+            return False
+        return bool(AUM_PHRASE_PATTERN.search(text.lower()) or CURRENCY_PATTERN.search(text))
+    
+    def render_gains(self, static_html: str, rendered_html: str) -> bool:
+        static_text = self.visible_text(static_html)
+        rendered_text = self.visible_text(rendered_html)
+        if len(rendered_text) <= len(static_text):
+            return False
+        return self.is_shell(static_html, static_text) or len(rendered_text) >= len(static_text) * settings.rendered_text_gain
+    
+    async def fetch_adaptive(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[str, int, str, Dict[str, str]]:
+        domain = DomainScheduler.domain_for(url)
+        strategy = await fetch_strategies.get(domain)
+        if strategy == BROWSER or (strategy is None and self.should_use_playwright(url)):
+            return await self.fetch_page(url, True, headers)
+        
+        static = await self.fetch_page(url, False, headers)
+        content, status_code = static[0], static[1]
+        if strategy == STATIC or status_code != 200:
+            return static
+        
+        if self.has_signal(content):
+            await fetch_strategies.remember(domain, STATIC)
+            return static
+        
+        rendered = await self.fetch_page(url, True, headers)
+        if rendered[1] == 200 and self.render_gains(content, rendered[0]):
+            await fetch_strategies.remember(domain, BROWSER)
+            return rendered
+        
+        if not self.is_shell(content, self.visible_text(content)):
+            await fetch_strategies.remember(domain, STATIC)
+        return static
+    
+    async def _scrape_with_requests(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[str, int, Dict[str, str]]:
+        response = await self.fetcher.fetch(url, headers=headers)
+        return response["content"], response["status_code"], response["headers"]
+    
+    def ready_selector_for(self, url: str) -> Optional[str]:
+        domain = DomainScheduler.domain_for(url)
+        for suffix, selector in settings.browser_ready_selectors.items():
+            if domain == suffix or domain.endswith('.' + suffix):
+                return selector
+        return None
+    
+    async def _wait_until_ready(self, page, url: str):
+        selector = self.ready_selector_for(url)
+        if not selector:
+            return
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True)
-                page = await browser.new_page()
+            await page.wait_for_selector(selector, state='attached', timeout=settings.browser_ready_timeout_ms)
+        except Exception:
+            pass
+    
+    async def _scrape_with_playwright(self, url: str) -> Tuple[str, int]:
+        if not settings.browser_lean_mode:
+            async with self.browser_pool.page() as page:
                 await page.goto(url, wait_until='networkidle', timeout=30000)
-                content = await page.content()
-                await browser.close()
-                return content, 200, ""
-        except Exception as e:
-            return "", 0, str(e)
+                return await page.content(), 200
+        
+        async with self.browser_pool.page(block_resources=True) as page:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=settings.browser_navigation_timeout_ms)
+            if response is not None and response.status >= 400:
+                raise FetchError(f"HTTP {response.status} for {url}", status_error_class(response.status))
+            await self._wait_until_ready(page, url)
+            return await page.evaluate(TEXT_DOM_SCRIPT), 200
+    
+    async def close(self):
+        await self.fetcher.close()
+        await self.browser_pool.close()
+    
+    def html_to_text(self, html: str) -> str:
+        try:
+            tree = lxml_html.document_fromstring(html)
+        except ValueError:
+            tree = lxml_html.document_fromstring(XML_DECLARATION.sub('', html, count=1))
+        
+        etree.strip_elements(tree, *DROPPED_TAGS, with_tail=False)
+        for element in tree.iter(*BLOCK_TAGS):
+            element.text = '\n' + (element.text or '')
+            element.tail = '\n' + (element.tail or '')
+        return tree.text_content()
+    
+    def split_paragraphs(self, html: str) -> List[str]:
+        paragraphs = []
+        for line in self.html_to_text(html).split('\n'):
+            line = ' '.join(line.split())
+            pieces = SENTENCE_BOUNDARY.split(line) if len(line) > MAX_PARAGRAPH_CHARS else [line]
+            paragraphs.extend(piece for piece in pieces if len(piece) > 10)
+        return paragraphs
+    
+    def focus(self, paragraph: str, max_tokens: int) -> str:
+        match = CURRENCY_PATTERN.search(paragraph) or AUM_PHRASE_PATTERN.search(paragraph.lower())
+        start = paragraph.rfind(' ', 0, max(0, match.start() - max_tokens * 2)) + 1 if match else 0
+        window = truncate_to_tokens(paragraph[start:], max_tokens)
+        if len(window) < len(paragraph) - start:
+            window = window.rsplit(' ', 1)[0]
+        return window
+    
+    def rank_paragraph(self, paragraph: str) -> float:
+        paragraph_lower = paragraph.lower()
+        keyword_hits = len(KEYWORD_PATTERN.findall(paragraph_lower))
+        currency = CURRENCY_PATTERN.search(paragraph)
+        
+        if not keyword_hits and not currency:
+            return 0.0
+        
+        score = min(keyword_hits / max(1, len(paragraph_lower.split())), 1.0)
+        phrase = AUM_PHRASE_PATTERN.search(paragraph_lower)
+        if phrase:
+            score += 2.0
+        if currency:
+            score += 2.0
+        if phrase and currency and abs(phrase.start() - currency.start()) <= 120:
+            score += 3.0
+        return score
     
     def extract_relevant_chunks(self, html: str, max_tokens: int = 1200) -> str:
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            for script in soup(["script", "style", "nav", "header", "footer"]):
-                script.decompose()
-            
-            text = soup.get_text()
-            paragraphs = [p.strip() for p in text.split('\n') if p.strip() and len(p.strip()) > 10]
+            paragraphs = self.split_paragraphs(html)
             
-            aum_keywords = [
-                'aum', 'assets under management', 'patrimônio sob gestão',
-                'patrimonio sob gestao', 'gestão de ativos', 'gestao de ativos',
-                'fundo', 'fundos', 'investimento', 'investimentos',
-                'capital', 'ativo', 'ativos', 'portfólio', 'portfolio',
-                'bilhões', 'bilhoes', 'milhões', 'milhoes', 'bi', 'mi', 'k', 'trilhões', 'trilhoes'
-            ]
-            currency_pattern = r'[R$US$€£¥]?\s*\d+[,.]?\d*\s*(?:bi|bilh[ãa]o|mi|milh[ãa]o|mil|k|milh[ãa]os|bilh[ãa]os|trilh[ãa]o|trilh[ãa]os|B|M|K|T)'
+            candidates = [(self.rank_paragraph(paragraph), index, paragraph) for index, paragraph in enumerate(paragraphs)]
+            candidates = sorted([c for c in candidates if c[0] > 0], key=lambda c: (-c[0], c[1]))
             
-            relevant_chunks = []
-            total_length = 0
+            if not candidates:
+                candidates = [(0.0, index, paragraph) for index, paragraph in enumerate(paragraphs[:5])]
             
-            for paragraph in paragraphs:
-                paragraph_lower = paragraph.lower()
-                has_keywords = any(keyword in paragraph_lower for keyword in aum_keywords)
-                has_currency = re.search(currency_pattern, paragraph, re.IGNORECASE)
-                
-                if has_keywords or has_currency:
-                    chunk_length = len(paragraph)
-                    if total_length + chunk_length <= max_tokens * 4:
-                        relevant_chunks.append(paragraph)
-                        total_length += chunk_length
-                    else:
-                        break
+            selected = []
+            remaining = max_tokens
             
-            if not relevant_chunks:
-                for paragraph in paragraphs[:5]:
-                    chunk_length = len(paragraph)
-                    if total_length + chunk_length <= max_tokens * 4:
-                        relevant_chunks.append(paragraph)
-                        total_length += chunk_length
-                    else:
-                        break
+            for _, index, paragraph in candidates:
+                tokens = count_tokens(paragraph) + (1 if selected else 0)
+                if not selected and tokens > remaining:
+                    paragraph = self.focus(paragraph, remaining)
+                    tokens = count_tokens(paragraph)
+                if tokens <= remaining:
+                    selected.append((index, paragraph))
+                    remaining -= tokens
+                if remaining <= 0:
+                    break
             
-            return '\n\n'.join(relevant_chunks)
+            return '\n\n'.join(paragraph for _, paragraph in sorted(selected))
         except Exception as e:
             return html[:max_tokens * 4]
 
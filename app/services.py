@@ -1,47 +1,166 @@
 import asyncio
-import pandas as pd
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from app.models import Company, ScrapeLog, AumSnapshot
+import json
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models import Company, ScrapeLog, AumSnapshot, ScrapeJob, ScrapeJobItem
 from app.scraper import scraper
 from app.ai_extractor import ai_extractor
-from app.schemas import CompanyCreate, AumSnapshotCreate, ScrapeLogCreate
+from app.heuristics import heuristic_extractor
+from app.page_cache import page_cache
+from app.bulk_writer import bulk_writer
+from app.crawler import CrawlFrontier, focused_crawler
+from app.resilience import ERROR_CLASS_HEADER, classify_exception
+from app.progress import ProgressTracker, progress_broker, summarize_result
+from app.schemas import AumSnapshotCreate, ScrapeLogCreate
 
 
 class ScrapingService:
-    def __init__(self):
-        self.max_concurrent_requests = 3
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.max_concurrent_companies = settings.max_concurrent_companies
     
-    async def load_companies_from_csv(self, csv_path: str, db: Session) -> List[Company]:
+    def _session(self) -> AsyncSession:
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+    
+    async def scrape_source(self, company: Company, source_type: str, url: str, frontier: Optional[CrawlFrontier] = None) -> Dict[str, Any]:
+        outcome = {"scraped_url": None, "aum_info": None}
+        
         try:
-            df = pd.read_csv(csv_path)
-            companies = []
+            async with self._session() as db:
+                cache_entry = await page_cache.get(company.id, url, db)
+            content, status_code, error_message, headers = await scraper.fetch_adaptive(
+                url,
+                page_cache.conditional_headers(cache_entry)
+            )
             
-            for _, row in df.iterrows():
-                company_data = CompanyCreate(
-                    name=row['name'],
-                    url_site=row.get('url_site') if pd.notna(row.get('url_site')) else None,
-                    url_linkedin=row.get('url_linkedin') if pd.notna(row.get('url_linkedin')) else None,
-                    url_instagram=row.get('url_instagram') if pd.notna(row.get('url_instagram')) else None,
-                    url_x=row.get('url_x') if pd.notna(row.get('url_x')) else None
-                )
-                
-                company = Company(**company_data.dict())
-                db.add(company)
-                companies.append(company)
+            fetched = status_code in (200, 304)
+            content_hash = page_cache.hash_content(content) if status_code == 200 and content else None
+            unchanged = page_cache.is_unchanged(cache_entry, status_code, content_hash)
             
-            db.commit()
+            scrape_log = ScrapeLogCreate(
+                company_id=company.id,
+                url=url,
+                source_type=source_type,
+                status="success" if fetched else "failed",
+                content_length=len(content) if content else 0,
+                error_message=error_message,
+                error_class=None if fetched else headers.get(ERROR_CLASS_HEADER, "unknown")
+            )
             
-            for company in companies:
-                db.refresh(company)
+            bulk_writer.add(ScrapeLog, scrape_log.dict())
             
-            return companies
+            outcome["scraped_url"] = {
+                "url": url,
+                "status": "unchanged" if unchanged else ("success" if fetched else "failed"),
+                "content_length": len(content) if content else 0
+            }
+            if not fetched:
+                outcome["scraped_url"]["error_class"] = scrape_log.error_class
+            
+            if unchanged:
+                async with self._session() as db:
+                    outcome["aum_info"] = await page_cache.last_snapshot(company.id, url, db)
+            elif status_code == 200 and content:
+                if frontier is not None:
+                    frontier.add_links(url, content)
+                aum_info = None
+                relevant_content = scraper.extract_relevant_chunks(content, ai_extractor.content_budget(company.name))
+                
+                if relevant_content:
+                    aum_info = heuristic_extractor.extract(relevant_content, url)
+                    
+                    if not aum_info or aum_info["confidence_score"] < settings.heuristic_confidence_threshold:
+                        async with self._session() as db:
+                            aum_info = await ai_extractor.extract_aum(
+                                company.name, 
+                                relevant_content, 
+                                url, 
+                                db
+                            )
+                    
+                    if aum_info["is_available"] and aum_info["aum_value"] != "NAO_DISPONIVEL":
+                        aum_snapshot = AumSnapshotCreate(
+                            company_id=company.id,
+                            aum_value=aum_info["aum_value"],
+                            aum_numeric=aum_info["aum_numeric"],
+                            aum_unit=aum_info["aum_unit"],
+                            source_url=url,
+                            source_type=source_type,
+                            confidence_score=aum_info["confidence_score"],
+                            is_available=True
+                        )
+                        
+                        bulk_writer.add(AumSnapshot, aum_snapshot.dict())
+                        
+                        outcome["aum_info"] = aum_info
+                
+                if not (aum_info and aum_info.get("error")):
+                    page_cache.store(company.id, url, headers, content_hash)
             
         except Exception as e:
-            db.rollback()
-            raise Exception(f"Error loading companies from CSV: {e}")
+            scrape_log = ScrapeLogCreate(
+                company_id=company.id,
+                url=url,
+                source_type=source_type,
+                status="failed",
+                error_message=str(e),
+                error_class=classify_exception(e)
+            )
+            bulk_writer.add(ScrapeLog, scrape_log.dict())
+            
+            outcome["scraped_url"] = {
+                "url": url,
+                "status": "failed",
+                "error": str(e)
+            }
+        
+        return outcome
+    
+    def is_confident(self, aum_info: Dict[str, Any]) -> bool:
+        threshold = settings.early_exit_confidence
+        return threshold is not None and aum_info["confidence_score"] >= threshold
+    
+    async def scrape_website(self, company: Company, url: str) -> Dict[str, Any]:
+        if not settings.crawl_enabled:
+            return await self.scrape_source(company, "website", url)
+        
+        frontier = CrawlFrontier(url)
+        site = asyncio.create_task(focused_crawler.site_info(url))
+        try:
+            outcome = await self.scrape_source(company, "website", url, frontier)
+            if outcome["aum_info"] and self.is_confident(outcome["aum_info"]):
+                return outcome
+            async with self._session() as db:
+                known_urls = await page_cache.snapshot_urls(company.id, db, frontier.max_pages)
+            frontier.seed(*await site, known_urls)
+        finally:
+            if not site.done():
+                site.cancel()
+            await asyncio.gather(site, return_exceptions=True)
+        
+        outcome["crawled_urls"] = []
+        while not (outcome["aum_info"] and self.is_confident(outcome["aum_info"])):
+            page_url = frontier.pop()
+            if page_url is None:
+                break
+            
+            page = await self.scrape_source(company, "website", page_url, frontier)
+            outcome["crawled_urls"].append(page["scraped_url"])
+            if page["aum_info"] and (
+                not outcome["aum_info"] or page["aum_info"]["confidence_score"] > outcome["aum_info"]["confidence_score"]
+            ):
+                outcome["aum_info"] = page["aum_info"]
+        
+        return outcome
     
-    async def scrape_company(self, company: Company, db: Session) -> Dict[str, Any]:
+    async def scrape_company(self, company: Company) -> Dict[str, Any]:
         results = {
             "company_id": company.id,
             "company_name": company.name,
@@ -60,87 +179,81 @@ class ScrapingService:
         if company.url_x:
             urls_to_scrape.append(("x", company.url_x))
         
-        for source_type, url in urls_to_scrape:
-            try:
-                use_playwright = scraper.should_use_playwright(url)
-                content, status_code, error_message = await scraper.scrape_url(url, use_playwright)
-                
-                scrape_log = ScrapeLogCreate(
-                    company_id=company.id,
-                    url=url,
-                    status="success" if status_code == 200 else "failed",
-                    content_length=len(content) if content else 0,
-                    error_message=error_message
-                )
-                
-                db.add(ScrapeLog(**scrape_log.dict()))
-                db.commit()
-                
-                results["scraped_urls"].append({
-                    "url": url,
-                    "status": "success" if status_code == 200 else "failed",
-                    "content_length": len(content) if content else 0
-                })
+        tasks = {
+            asyncio.create_task(
+                self.scrape_website(company, url) if source_type == "website" else self.scrape_source(company, source_type, url)
+            ): url
+            for source_type, url in urls_to_scrape
+        }
+        
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                confident = False
                 
-                if status_code == 200 and content:
-                    relevant_content = scraper.extract_relevant_chunks(content)
+                for task in done:
+                    outcome = task.result()
+                    results["scraped_urls"].append(outcome["scraped_url"])
+                    results["scraped_urls"].extend(outcome.get("crawled_urls", []))
                     
-                    if relevant_content:
-                        aum_info = await ai_extractor.extract_aum(
-                            company.name, 
-                            relevant_content, 
-                            url, 
-                            db
-                        )
-                        
-                        if aum_info["is_available"] and aum_info["aum_value"] != "NAO_DISPONIVEL":
-                            aum_snapshot = AumSnapshotCreate(
-                                company_id=company.id,
-                                aum_value=aum_info["aum_value"],
-                                aum_numeric=aum_info["aum_numeric"],
-                                aum_unit=aum_info["aum_unit"],
-                                source_url=url,
-                                source_type=source_type,
-                                confidence_score=aum_info["confidence_score"],
-                                is_available=True
-                            )
-                            
-                            db.add(AumSnapshot(**aum_snapshot.dict()))
-                            db.commit()
-                            
-                            results["aum_snapshots"].append(aum_info)
-                            results["aum_found"] = True
+                    if outcome["aum_info"]:
+                        results["aum_snapshots"].append(outcome["aum_info"])
+                        results["aum_found"] = True
+                        confident = confident or self.is_confident(outcome["aum_info"])
                 
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                scrape_log = ScrapeLogCreate(
-                    company_id=company.id,
-                    url=url,
-                    status="failed",
-                    error_message=str(e)
-                )
-                db.add(ScrapeLog(**scrape_log.dict()))
-                db.commit()
-                
-                results["scraped_urls"].append({
-                    "url": url,
-                    "status": "failed",
-                    "error": str(e)
-                })
+                if confident:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+                results["scraped_urls"].append({"url": tasks[task], "status": "cancelled"})
+            await asyncio.gather(*pending, return_exceptions=True)
         
         return results
     
-    async def scrape_companies(self, company_ids: Optional[List[int]] = None, db: Session = None) -> Dict[str, Any]:
-        if not db:
-            from app.database import SessionLocal
-            db = SessionLocal()
+    async def load_companies(self, company_ids: Optional[List[int]] = None) -> List[Company]:
+        query = select(Company)
+        if company_ids:
+            query = query.where(Company.id.in_(company_ids))
         
+        async with self._session() as db:
+            return list((await db.scalars(query)).all())
+    
+    async def iter_scrape_companies(self, companies: List[Company]) -> AsyncIterator[Dict[str, Any]]:
+        tracker = ProgressTracker(len(companies))
+        remaining = iter(companies)
+        pending = {}
+        
+        def schedule():
+            for company in remaining:
+                pending[asyncio.create_task(self.scrape_company(company))] = company
+                if len(pending) >= self.max_concurrent_companies:
+                    break
+        
+        schedule()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    company = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        result = {"company_id": company.id, "company_name": company.name, "error": str(e), "aum_found": False}
+                    
+                    tracker.record(result)
+                    yield {"type": "result", "result": result, "progress": tracker.snapshot()}
+                schedule()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await bulk_writer.flush()
+    
+    async def scrape_companies(self, company_ids: Optional[List[int]] = None) -> Dict[str, Any]:
         try:
-            if company_ids:
-                companies = db.query(Company).filter(Company.id.in_(company_ids)).all()
-            else:
-                companies = db.query(Company).all()
+            companies = await self.load_companies(company_ids)
             
             if not companies:
                 return {
@@ -150,72 +263,157 @@ class ScrapingService:
                     "failed_scrapes": 0
                 }
             
-            semaphore = asyncio.Semaphore(self.max_concurrent_requests)
-            
-            async def scrape_with_semaphore(company):
-                async with semaphore:
-                    return await self.scrape_company(company, db)
-            
-            tasks = [scrape_with_semaphore(company) for company in companies]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            successful_scrapes = 0
-            failed_scrapes = 0
-            
-            for result in results:
-                if isinstance(result, Exception):
-                    failed_scrapes += 1
-                elif result.get("aum_found"):
-                    successful_scrapes += 1
-                else:
-                    failed_scrapes += 1
+            results = []
+            progress = None
+            async for event in self.iter_scrape_companies(companies):
+                results.append(event["result"])
+                progress = event["progress"]
             
             return {
                 "message": f"Scraping completed for {len(companies)} companies",
                 "companies_processed": len(companies),
-                "successful_scrapes": successful_scrapes,
-                "failed_scrapes": failed_scrapes,
+                "successful_scrapes": progress["successful"],
+                "failed_scrapes": progress["failed"],
                 "results": results
             }
             
         except Exception as e:
             raise Exception(f"Error in scraping companies: {e}")
-        finally:
-            if db:
-                db.close()
     
-    def export_to_excel(self, db: Session, output_path: str = "aum_results.xlsx"):
+    async def create_scrape_job(self, company_ids: Optional[List[int]], db: AsyncSession) -> ScrapeJob:
+        query = select(Company.id)
+        if company_ids:
+            query = query.where(Company.id.in_(company_ids))
+        ids = list((await db.scalars(query)).all())
+        if company_ids:
+            found = set(ids)
+            ids = [company_id for company_id in dict.fromkeys(company_ids) if company_id in found]
+        
+        job = ScrapeJob(
+            id=str(uuid.uuid4()),
+            status="queued" if ids else "completed",
+            total_companies=len(ids),
+            finished_at=None if ids else datetime.utcnow()
+        )
+        db.add(job)
+        db.add_all([ScrapeJobItem(job_id=job.id, company_id=company_id) for company_id in ids])
+        await db.commit()
+        
+        published = []
         try:
-            companies = db.query(Company).all()
-            
-            data = []
-            for company in companies:
-                latest_aum = db.query(AumSnapshot).filter(
-                    AumSnapshot.company_id == company.id
-                ).order_by(AumSnapshot.created_at.desc()).first()
-                
-                data.append({
-                    "Company Name": company.name,
-                    "Website": company.url_site or "",
-                    "LinkedIn": company.url_linkedin or "",
-                    "Instagram": company.url_instagram or "",
-                    "X (Twitter)": company.url_x or "",
-                    "AUM Value": latest_aum.aum_value if latest_aum else "NAO_DISPONIVEL",
-                    "AUM Numeric": latest_aum.aum_numeric if latest_aum else None,
-                    "AUM Unit": latest_aum.aum_unit if latest_aum else None,
-                    "Source URL": latest_aum.source_url if latest_aum else "",
-                    "Source Type": latest_aum.source_type if latest_aum else "",
-                    "Confidence Score": latest_aum.confidence_score if latest_aum else 0.0,
-                    "Last Updated": latest_aum.created_at.replace(tzinfo=None) if latest_aum else "",
-                })
-            
-            df = pd.DataFrame(data)
-            df.to_excel(output_path, index=False)
+            await asyncio.to_thread(self.publish_job_tasks, job.id, ids, published)
+        except Exception as e:
+            await self.fail_unpublished(job.id, ids[len(published):], e, db)
+            raise Exception(f"Error queueing scrape job {job.id}: {e}")
+        
+        return job
+    
+    def publish_job_tasks(self, job_id: str, company_ids: List[int], published: List[int]):
+        from app.tasks import scrape_companies_task
+        
+        for start in range(0, len(company_ids), settings.job_chunk_size):
+            chunk = company_ids[start:start + settings.job_chunk_size]
+            scrape_companies_task.delay(job_id, chunk)
+            published.extend(chunk)
+    
+    async def load_job_companies(self, job_id: str, company_ids: List[int]) -> Dict[int, Optional[Company]]:
+        async with self._session() as db:
+            queued = set((await db.scalars(select(ScrapeJobItem.company_id).where(
+                ScrapeJobItem.job_id == job_id,
+                ScrapeJobItem.company_id.in_(company_ids),
+                ScrapeJobItem.status == "queued"
+            ))).all())
+            companies = {company.id: company for company in (await db.scalars(
+                select(Company).where(Company.id.in_(queued))
+            )).all()}
+        return {company_id: companies.get(company_id) for company_id in company_ids if company_id in queued}
+    
+    async def fail_unpublished(self, job_id: str, company_ids: List[int], error: Exception, db: AsyncSession):
+        for company_id in company_ids:
+            await self.record_job_result(job_id, company_id, {
+                "company_id": company_id,
+                "error": f"Failed to queue: {error}",
+                "aum_found": False
+            }, db)
+        
+        await db.execute(update(ScrapeJob).where(
+            ScrapeJob.id == job_id,
+            ScrapeJob.failed_scrapes >= ScrapeJob.total_companies
+        ).values({ScrapeJob.status: "failed"}).execution_options(synchronize_session=False))
+        await db.commit()
+    
+    async def record_job_result(self, job_id: str, company_id: int, result: Dict[str, Any], db: AsyncSession):
+        aum_found = bool(result.get("aum_found"))
+        
+        recorded = await db.execute(update(ScrapeJobItem).where(
+            ScrapeJobItem.job_id == job_id,
+            ScrapeJobItem.company_id == company_id,
+            ScrapeJobItem.status == "queued"
+        ).values({
+            ScrapeJobItem.status: "failed" if result.get("error") else "completed",
+            ScrapeJobItem.aum_found: aum_found,
+            ScrapeJobItem.result: json.dumps(result, default=str),
+            ScrapeJobItem.updated_at: datetime.utcnow()
+        }).execution_options(synchronize_session=False))
+        
+        if not recorded.rowcount:
+            await db.rollback()
+            return
+        
+        await db.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values({
+            ScrapeJob.status: "running",
+            ScrapeJob.completed_companies: ScrapeJob.completed_companies + 1,
+            ScrapeJob.successful_scrapes: ScrapeJob.successful_scrapes + (1 if aum_found else 0),
+            ScrapeJob.failed_scrapes: ScrapeJob.failed_scrapes + (0 if aum_found else 1)
+        }).execution_options(synchronize_session=False))
+        
+        await db.execute(update(ScrapeJob).where(
+            ScrapeJob.id == job_id,
+            ScrapeJob.completed_companies >= ScrapeJob.total_companies
+        ).values({
+            ScrapeJob.status: "completed",
+            ScrapeJob.finished_at: datetime.utcnow()
+        }).execution_options(synchronize_session=False))
+        
+        await db.commit()
+        
+        job = await db.get(ScrapeJob, job_id, populate_existing=True)
+        await progress_broker.publish(job_id, {
+            "type": "result",
+            "result": summarize_result(result),
+            "progress": ProgressTracker.from_job(job).snapshot()
+        })
+    
+    async def job_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        async with self._session() as db:
+            job = await db.get(ScrapeJob, job_id)
+            return ProgressTracker.from_job(job).snapshot() if job else None
+    
+    async def iter_job_progress(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        async with progress_broker.subscribe(job_id) as receive:
+            progress = await self.job_progress(job_id)
+            if progress is None:
+                return
+            yield {"type": "progress", "progress": progress}
             
-            return output_path
+            while not progress["done"]:
+                event = await receive(settings.progress_heartbeat_seconds)
+                if event is None:
+                    progress = await self.job_progress(job_id)
+                    yield {"type": "progress", "progress": progress}
+                else:
+                    progress = event["progress"]
+                    yield event
             
-        except Exception as e:
-            raise Exception(f"Error exporting to Excel: {e}")
+            yield {"type": "complete", "progress": progress}
+    
+    async def get_job_results(self, job_id: str, db: AsyncSession) -> List[Dict[str, Any]]:
+        items = (await db.scalars(select(ScrapeJobItem).where(
+            ScrapeJobItem.job_id == job_id,
+            ScrapeJobItem.result.isnot(None)
+        ).order_by(ScrapeJobItem.updated_at))).all()
+        
+        return [json.loads(item.result) for item in items]
 
 
 scraping_service = ScrapingService()
@@ -0,0 +1,159 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+from sqlalchemy import select, func, distinct, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import upsert
+from app.models import Company, ScrapeLog, AumSnapshot, ScrapeStat
+
+
+class ScrapeStatsStore:
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.interval = settings.stats_reconcile_interval_seconds
+        self._reconciler: Optional[asyncio.Task] = None
+        self.reconciled_at: Optional[datetime] = None
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.database import SessionLocal
+            self.session_factory = SessionLocal
+        return self.session_factory()
+
+    async def collect(self, buffers: Dict[type, List[dict]], db: AsyncSession) -> Dict[str, int]:
+        deltas = Counter()
+
+        for row in buffers.get(ScrapeLog, []):
+            source = row.get("source_type") or "unknown"
+            succeeded = row["status"] == "success"
+            deltas["total_scrapes"] += 1
+            deltas["successful_scrapes" if succeeded else "failed_scrapes"] += 1
+            deltas[f"scrapes:{source}"] += 1
+            if succeeded:
+                deltas[f"successful_scrapes:{source}"] += 1
+            else:
+                deltas[f"errors:{row.get('error_class') or 'unknown'}"] += 1
+
+        company_ids = {row["company_id"] for row in buffers.get(AumSnapshot, [])}
+        if company_ids:
+            existing = await db.scalars(
+                select(distinct(AumSnapshot.company_id)).where(AumSnapshot.company_id.in_(company_ids))
+            )
+            deltas["companies_with_aum"] += len(company_ids - set(existing.all()))
+
+        return dict(deltas)
+
+    async def increment(self, deltas: Dict[str, int], db: AsyncSession):
+        rows = [{"key": key, "value": value} for key, value in deltas.items() if value]
+        if not rows:
+            return
+
+        statement = upsert(ScrapeStat, db)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[ScrapeStat.key],
+            set_={"value": ScrapeStat.value + statement.excluded.value, "updated_at": datetime.utcnow()}
+        ), rows)
+
+    async def read(self, db: AsyncSession) -> Dict[str, int]:
+        rows = (await db.execute(select(ScrapeStat.key, ScrapeStat.value))).all()
+        return {key: value for key, value in rows}
+
+    def summarize(self, counters: Dict[str, int]) -> Dict[str, Any]:
+        total_scrapes = counters.get("total_scrapes", 0)
+        successful_scrapes = counters.get("successful_scrapes", 0)
+
+        by_source = {}
+        by_error_class = {}
+        for key, value in counters.items():
+            if key.startswith("errors:"):
+                by_error_class[key.split(":", 1)[1]] = value
+            if key.startswith("scrapes:"):
+                source = key.split(":", 1)[1]
+                successful = counters.get(f"successful_scrapes:{source}", 0)
+                by_source[source] = {
+                    "scrapes": value,
+                    "successful_scrapes": successful,
+                    "success_rate": round(successful / value * 100, 1) if value else 0
+                }
+
+        return {
+            "total_companies": counters.get("total_companies", 0),
+            "companies_with_aum": counters.get("companies_with_aum", 0),
+            "total_scrapes": total_scrapes,
+            "successful_scrapes": successful_scrapes,
+            "failed_scrapes": counters.get("failed_scrapes", 0),
+            "success_rate": round(successful_scrapes / total_scrapes * 100, 1) if total_scrapes else 0,
+            "by_source": by_source,
+            "by_error_class": by_error_class
+        }
+
+    async def reconcile(self, db: AsyncSession) -> Dict[str, int]:
+        counters = {
+            "total_companies": await db.scalar(select(func.count()).select_from(Company)),
+            "companies_with_aum": await db.scalar(select(func.count(distinct(AumSnapshot.company_id)))),
+            "total_scrapes": 0,
+            "successful_scrapes": 0,
+            "failed_scrapes": 0,
+        }
+
+        grouped = await db.execute(
+            select(ScrapeLog.source_type, ScrapeLog.status, ScrapeLog.error_class, func.count())
+            .group_by(ScrapeLog.source_type, ScrapeLog.status, ScrapeLog.error_class)
+        )
+        for source, status, error_class, count in grouped.all():
+            source = source or "unknown"
+            succeeded = status == "success"
+            counters["total_scrapes"] += count
+            counters["successful_scrapes" if succeeded else "failed_scrapes"] += count
+            counters[f"scrapes:{source}"] = counters.get(f"scrapes:{source}", 0) + count
+            if succeeded:
+                counters[f"successful_scrapes:{source}"] = counters.get(f"successful_scrapes:{source}", 0) + count
+            else:
+                key = f"errors:{error_class or 'unknown'}"
+                counters[key] = counters.get(key, 0) + count
+
+        now = datetime.utcnow()
+        statement = upsert(ScrapeStat, db)
+        await db.execute(statement.on_conflict_do_update(
+            index_elements=[ScrapeStat.key],
+            set_={"value": statement.excluded.value, "updated_at": now}
+        ), [{"key": key, "value": value, "updated_at": now} for key, value in counters.items()])
+        await db.execute(delete(ScrapeStat).where(ScrapeStat.key.notin_(counters)))
+        await db.commit()
+
+        self.reconciled_at = now
+        return counters
+
+    async def reconcile_if_empty(self):
+        async with self._session() as db:
+            if not await self.read(db):
+                await self.reconcile(db)
+
+    async def _reconcile_periodically(self):
+        try:
+            await self.reconcile_if_empty()
+        except Exception:
+            pass
+
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with self._session() as db:
+                    await self.reconcile(db)
+            except Exception:
+                pass
+
+    def start(self):
+        if self._reconciler is None or self._reconciler.done():
+            self._reconciler = asyncio.get_running_loop().create_task(self._reconcile_periodically())
+
+    async def close(self):
+        if self._reconciler is not None:
+            self._reconciler.cancel()
+            await asyncio.gather(self._reconciler, return_exceptions=True)
+            self._reconciler = None
+
+
+scrape_stats = ScrapeStatsStore()
@@ -0,0 +1,62 @@
+import asyncio
+from typing import List
+from app.celery_app import celery_app
+from app.database import SessionLocal
+from app.services import scraping_service
+from app.bulk_writer import bulk_writer
+from app.budget import budget_governor
+from app.scheduler import rescrape_scheduler
+
+_loop = None
+
+
+def run_async(coro):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
+
+
+async def _record(job_id: str, company_id: int, result: dict):
+    for buffer in (bulk_writer, budget_governor):
+        try:
+            await buffer.flush()
+        except Exception:
+            pass
+    async with SessionLocal() as db:
+        await scraping_service.record_job_result(job_id, company_id, result, db)
+
+
+async def _scrape_companies_for_job(job_id: str, company_ids: List[int]) -> List[dict]:
+    queued = await scraping_service.load_job_companies(job_id, company_ids)
+    results = []
+    
+    for company_id, company in queued.items():
+        if company is None:
+            result = {"company_id": company_id, "error": "Company not found", "aum_found": False}
+            await _record(job_id, company_id, result)
+            results.append(result)
+    
+    companies = [company for company in queued.values() if company is not None]
+    async for event in scraping_service.iter_scrape_companies(companies):
+        result = event["result"]
+        await _record(job_id, result["company_id"], result)
+        results.append(result)
+    return results
+
+
+@celery_app.task(name="app.tasks.scrape_companies_task")
+def scrape_companies_task(job_id: str, company_ids: List[int]):
+    results = run_async(_scrape_companies_for_job(job_id, company_ids))
+    return {"companies": len(results), "aum_found": sum(1 for result in results if result.get("aum_found"))}
+
+
+@celery_app.task(name="app.tasks.scrape_company_task")
+def scrape_company_task(job_id: str, company_id: int):
+    return scrape_companies_task(job_id, [company_id])
+
+
+@celery_app.task(name="app.tasks.rescrape_cycle_task")
+def rescrape_cycle_task():
+    return run_async(rescrape_scheduler.run_cycle())
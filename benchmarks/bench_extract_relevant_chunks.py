@@ -0,0 +1,98 @@
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.scraper import WebScraper
+
+
+LEGACY_KEYWORDS = [
+    'aum', 'assets under management', 'patrimônio sob gestão',
+    'patrimonio sob gestao', 'gestão de ativos', 'gestao de ativos',
+    'fundo', 'fundos', 'investimento', 'investimentos',
+    'capital', 'ativo', 'ativos', 'portfólio', 'portfolio',
+    'bilhões', 'bilhoes', 'milhões', 'milhoes', 'bi', 'mi', 'k', 'trilhões', 'trilhoes'
+]
+LEGACY_CURRENCY_PATTERN = r'[R$US$€£¥]?\s*\d+[,.]?\d*\s*(?:bi|bilh[ãa]o|mi|milh[ãa]o|mil|k|milh[ãa]os|bilh[ãa]os|trilh[ãa]o|trilh[ãa]os|B|M|K|T)'
+
+
+def legacy_relevant_paragraphs(html: str) -> list:
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    for script in soup(["script", "style", "nav", "header", "footer"]):
+        script.decompose()
+    
+    text = soup.get_text()
+    paragraphs = [p.strip() for p in text.split('\n') if p.strip() and len(p.strip()) > 10]
+    
+    relevant = []
+    for paragraph in paragraphs:
+        paragraph_lower = paragraph.lower()
+        has_keywords = any(keyword in paragraph_lower for keyword in LEGACY_KEYWORDS)
+        has_currency = re.search(LEGACY_CURRENCY_PATTERN, paragraph, re.IGNORECASE)
+        if has_keywords or has_currency:
+            relevant.append(paragraph)
+    return relevant
+
+
+def legacy_extract_relevant_chunks(html: str, max_tokens: int = 1200) -> str:
+    relevant_chunks = []
+    total_length = 0
+    
+    for paragraph in legacy_relevant_paragraphs(html):
+        chunk_length = len(paragraph)
+        if total_length + chunk_length <= max_tokens * 4:
+            relevant_chunks.append(paragraph)
+            total_length += chunk_length
+        else:
+            break
+    
+    return '\n\n'.join(relevant_chunks)
+
+
+def current_relevant_paragraphs(scraper: WebScraper, html: str) -> list:
+    return [p for p in scraper.split_paragraphs(html) if scraper.rank_paragraph(p) > 0]
+
+
+def build_page(paragraphs: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    words = ['empresa', 'mercado', 'cliente', 'equipe', 'serviço', 'história', 'valores', 'contato', 'sobre', 'nós']
+    body = []
+    for index in range(paragraphs):
+        sentence = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 40)))
+        if index % 97 == 0:
+            sentence += f' com R$ {rng.randint(1, 90)},{rng.randint(0, 9)} bilhões sob gestão'
+        body.append(f'<div class="row"><p>{sentence}</p>\n<span>{sentence[:30]}</span></div>')
+        if index % 50 == 0:
+            body.append('<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>')
+            body.append('<nav><a href="/sobre">Sobre</a><a href="/fundos">Fundos</a></nav>')
+    return '<html><head><style>p { color: red }</style></head><body><header>Topo</header>' + '\n'.join(body) + '<footer>Rodapé</footer></body></html>'
+
+
+def bench(function, html: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(html)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    scraper = WebScraper()
+    
+    for paragraphs in (500, 5000, 20000):
+        html = build_page(paragraphs)
+        assert current_relevant_paragraphs(scraper, html) == legacy_relevant_paragraphs(html), "candidate paragraphs differ"
+        
+        legacy = bench(legacy_extract_relevant_chunks, html, 3)
+        current = bench(scraper.extract_relevant_chunks, html, 3)
+        print(f"{len(html) / 1e6:6.2f} MB  legacy {legacy * 1000:8.1f} ms  current {current * 1000:8.1f} ms  speedup {legacy / current:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
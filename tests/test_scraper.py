@@ -1,11 +1,79 @@
+import os
 import pytest
+import pytest_asyncio
 import asyncio
 from unittest.mock import Mock, patch, AsyncMock
+from sqlalchemy import select, update, func
 from app.scraper import WebScraper
 from app.ai_extractor import AIExtractor
+from app.llm_cache import LlmResponseCache
 from app.services import ScrapingService
 from app.models import Company, AumSnapshot, ScrapeLog, Usage
 from app.schemas import CompanyCreate
+from app.tokenizer import count_tokens
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.models import Base
+    
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def sqlite_db(session_factory):
+    async with session_factory() as db:
+        yield db
+
+
+@pytest.fixture(autouse=True)
+def isolated_bulk_writer(session_factory):
+    from app.bulk_writer import bulk_writer
+    
+    with patch.object(bulk_writer, 'session_factory', session_factory):
+        yield bulk_writer
+    bulk_writer._buffers = {}
+
+
+@pytest.fixture(autouse=True)
+def isolated_budget_governor(session_factory):
+    from app.budget import budget_governor, MemoryBudgetCounter
+    
+    with patch.object(budget_governor, 'session_factory', session_factory), \
+         patch.object(budget_governor, 'counter', MemoryBudgetCounter()), \
+         patch.object(budget_governor, '_seeded', set()), \
+         patch.object(budget_governor, '_pending', {}), \
+         patch.object(budget_governor, 'limit_usd', budget_governor.limit_usd):
+        yield budget_governor
+
+
+@pytest.fixture(autouse=True)
+def isolated_fetch_strategies(session_factory):
+    from app.fetch_strategy import fetch_strategies
+    
+    with patch.object(fetch_strategies, 'session_factory', session_factory), \
+         patch.object(fetch_strategies, '_strategies', None):
+        yield fetch_strategies
+
+
+@pytest.fixture(autouse=True)
+def isolated_crawler():
+    from app.crawler import focused_crawler
+    
+    with patch.object(focused_crawler, '_sites', {}):
+        yield focused_crawler
+
+
+async def count_rows(db, model) -> int:
+    return await db.scalar(select(func.count()).select_from(model))
 
 
 class TestWebScraper:
@@ -30,6 +98,65 @@ class TestWebScraper:
         assert "AUM" in result or "Assets under management" in result
         assert "R$ 2.3" in result or "US$ 1.5" in result
     
+    def test_extract_relevant_chunks_drops_boilerplate(self, scraper):
+        html = """<?xml version="1.0" encoding="utf-8"?>
+        <html>
+            <head><style>.aum { color: red }</style><script>var fundos = "R$ 9 bi";</script></head>
+            <body>
+                <header>Fundos e investimentos no topo</header>
+                <nav>Nossos fundos de investimento</nav>
+                <!-- patrimônio sob gestão escondido -->
+                <p>A casa possui R$ 4,1 bilhões sob gestão</p>
+                <footer>Capital social do rodapé</footer>
+            </body>
+        </html>
+        """
+        
+        result = scraper.extract_relevant_chunks(html)
+        
+        assert result == "A casa possui R$ 4,1 bilhões sob gestão"
+    
+    def test_extract_relevant_chunks_falls_back_to_leading_paragraphs(self, scraper):
+        html = "<html><body><p>Somos uma empresa de Porto Alegre</p>\n<p>Fale com a nossa equipe</p></body></html>"
+        
+        result = scraper.extract_relevant_chunks(html)
+        
+        assert result == "Somos uma empresa de Porto Alegre\n\nFale com a nossa equipe"
+    
+    def test_extract_relevant_chunks_prefers_aum_sentence(self, scraper):
+        filler = "\n".join(f"<p>Conheça nossos fundos de investimento número {i} e o blog</p>" for i in range(200))
+        html = f"<html><body>{filler}\n<p>Hoje temos R$ 12,5 bilhões sob gestão em 40 fundos</p></body></html>"
+        
+        result = scraper.extract_relevant_chunks(html, max_tokens=40)
+        
+        assert "Hoje temos R$ 12,5 bilhões sob gestão em 40 fundos" in result
+        assert "número 199" not in result
+    
+    def test_extract_relevant_chunks_splits_minified_blocks(self, scraper):
+        filler = "".join(f"<p>Conheça nossos fundos de investimento número {i} e o blog</p>" for i in range(300))
+        html = f"<html><body><div>{filler}<p>Hoje temos R$ 2,3 bilhões sob gestão</p></div></body></html>"
+        
+        result = scraper.extract_relevant_chunks(html, max_tokens=1378)
+        
+        assert "Hoje temos R$ 2,3 bilhões sob gestão" in result
+        assert count_tokens(result) <= 1378
+    
+    def test_extract_relevant_chunks_truncates_oversize_paragraph_around_figure(self, scraper):
+        words = " ".join(f"palavra{i}" for i in range(3000))
+        html = f"<p>{words} com R$ 2,3 bilhões sob gestão {words}</p>"
+        
+        result = scraper.extract_relevant_chunks(html, max_tokens=200)
+        
+        assert "R$ 2,3 bilhões sob gestão" in result
+        assert 150 < count_tokens(result) <= 200
+    
+    def test_extract_relevant_chunks_keeps_document_order(self, scraper):
+        html = "<p>Fundos abertos para investidores</p>\n<p>Patrimônio sob gestão de R$ 3 bi</p>"
+        
+        result = scraper.extract_relevant_chunks(html)
+        
+        assert result == "Fundos abertos para investidores\n\nPatrimônio sob gestão de R$ 3 bi"
+    
     def test_should_use_playwright(self, scraper):
         assert scraper.should_use_playwright("https://instagram.com/company") == True
         assert scraper.should_use_playwright("https://twitter.com/company") == True
@@ -37,17 +164,617 @@ class TestWebScraper:
     
     @pytest.mark.asyncio
     async def test_scrape_url_requests(self, scraper):
-        with patch('requests.Session.get') as mock_get:
-            mock_response = Mock()
-            mock_response.text = "<html><body>Test content</body></html>"
-            mock_response.status_code = 200
-            mock_get.return_value = mock_response
+        with patch('app.fetcher.HttpFetcher.fetch', new_callable=AsyncMock) as mock_fetch:
+            mock_fetch.return_value = {
+                "content": "<html><body>Test content</body></html>",
+                "status_code": 200,
+                "headers": {},
+                "url": "https://example.com"
+            }
             
             content, status, error = await scraper.scrape_url("https://example.com")
             
             assert content == "<html><body>Test content</body></html>"
             assert status == 200
             assert error == ""
+    
+    def test_has_signal(self, scraper):
+        assert scraper.has_signal("<html><body><p>Temos R$ 2 bi sob gestão</p></body></html>")
+        assert not scraper.has_signal('<html><body><div id="root"></div><noscript>Enable JavaScript</noscript></body></html>')
+        assert not scraper.has_signal("<html><body><p>Fale conosco pelo formulário</p></body></html>")
+        assert not scraper.has_signal("")
+    
+    @pytest.mark.asyncio
+    async def test_fetch_adaptive_learns_browser_for_spa_domain(self, scraper, session_factory, isolated_fetch_strategies):
+        from app.fetch_strategy import FetchStrategyStore
+        shell = '<html><body><div id="__next"></div></body></html>'
+        rendered = "<html><body><p>Patrimônio sob gestão de R$ 3 bi</p></body></html>"
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            return (rendered if use_playwright else shell), 200, "", {}
+        
+        with patch.object(scraper, 'fetch_page', side_effect=fetch) as mock_fetch:
+            content, status, _, _ = await scraper.fetch_adaptive("https://www.gestora.com.br/")
+            assert content == rendered
+            assert [call.args[1] for call in mock_fetch.call_args_list] == [False, True]
+            
+            mock_fetch.reset_mock()
+            await scraper.fetch_adaptive("https://gestora.com.br/sobre")
+            assert [call.args[1] for call in mock_fetch.call_args_list] == [True]
+        
+        assert await FetchStrategyStore(session_factory).get("gestora.com.br") == "browser"
+    
+    @pytest.mark.asyncio
+    async def test_fetch_adaptive_prefers_richer_render_without_aum(self, scraper, isolated_fetch_strategies):
+        static = "<html><body><p>Carregando</p></body></html>"
+        rendered = "<html><body>" + "<p>Nossa equipe investe com disciplina e foco no longo prazo.</p>" * 10 + "</body></html>"
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            return (rendered if use_playwright else static), 200, "", {}
+        
+        with patch.object(scraper, 'fetch_page', side_effect=fetch):
+            content, _, _, _ = await scraper.fetch_adaptive("https://rica.com.br/")
+        
+        assert content == rendered
+        assert await isolated_fetch_strategies.get("rica.com.br") == "browser"
+    
+    @pytest.mark.asyncio
+    async def test_fetch_adaptive_does_not_cache_static_for_shell(self, scraper, isolated_fetch_strategies):
+        shell = '<html><body><div id="root"></div></body></html>'
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            return ("", 0, "timeout", {}) if use_playwright else (shell, 200, "", {})
+        
+        with patch.object(scraper, 'fetch_page', side_effect=fetch):
+            content, status, _, _ = await scraper.fetch_adaptive("https://spa.com.br/")
+        
+        assert (content, status) == (shell, 200)
+        assert await isolated_fetch_strategies.get("spa.com.br") is None
+    
+    @pytest.mark.asyncio
+    async def test_fetch_adaptive_keeps_static_when_it_has_signal(self, scraper, isolated_fetch_strategies):
+        page = "<html><body><p>Somos uma gestora com R$ 5 bilhões sob gestão</p></body></html>"
+        
+        with patch.object(scraper, 'fetch_page', return_value=(page, 200, "", {"etag": '"v1"'})) as mock_fetch:
+            for _ in range(2):
+                content, status, _, headers = await scraper.fetch_adaptive("https://static.com.br", {"If-None-Match": '"v0"'})
+        
+        assert (content, headers) == (page, {"etag": '"v1"'})
+        assert [call.args[1] for call in mock_fetch.call_args_list] == [False, False]
+        assert mock_fetch.call_args.args[2] == {"If-None-Match": '"v0"'}
+        assert await isolated_fetch_strategies.get("static.com.br") == "static"
+    
+    @pytest.fixture
+    def browser_page(self, scraper):
+        from contextlib import asynccontextmanager
+        page = AsyncMock()
+        page.goto.return_value = Mock(status=200)
+        page.evaluate.return_value = "<html><body><p>R$ 2 bi sob gestão</p></body></html>"
+        opened = []
+        
+        @asynccontextmanager
+        async def open_page(block_resources=False):
+            opened.append(block_resources)
+            yield page
+        
+        with patch.object(scraper.browser_pool, 'page', open_page):
+            page.opened = opened
+            yield page
+    
+    @pytest.mark.asyncio
+    async def test_playwright_lean_mode(self, scraper, browser_page):
+        from app.scraper import TEXT_DOM_SCRIPT
+        
+        content, status, error = await scraper.scrape_url("https://www.linkedin.com/company/test", use_playwright=True)
+        
+        assert (content, status, error) == ("<html><body><p>R$ 2 bi sob gestão</p></body></html>", 200, "")
+        assert browser_page.opened == [True]
+        assert browser_page.goto.call_args.kwargs["wait_until"] == "domcontentloaded"
+        assert browser_page.wait_for_selector.call_args.args[0] == "main, section.core-section-container"
+        browser_page.evaluate.assert_awaited_once_with(TEXT_DOM_SCRIPT)
+        browser_page.content.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_playwright_lean_mode_tolerates_missing_ready_selector(self, scraper, browser_page):
+        browser_page.wait_for_selector.side_effect = TimeoutError("Timeout 5000ms exceeded")
+        
+        content, status, _ = await scraper.scrape_url("https://instagram.com/test", use_playwright=True)
+        assert status == 200
+        assert "sob gestão" in content
+        
+        browser_page.goto.return_value = Mock(status=404)
+        content, status, error = await scraper.scrape_url("https://instagram.com/missing", use_playwright=True)
+        assert (content, status) == ("", 0)
+        assert "404" in error
+    
+    @pytest.mark.asyncio
+    async def test_scrape_url_http_error(self, scraper):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        
+        app = web.Application()
+        app.router.add_get("/missing", lambda request: web.Response(status=404))
+        
+        async with TestServer(app) as server:
+            content, status, error = await scraper.scrape_url(str(server.make_url("/missing")))
+            await scraper.close()
+        
+        assert content == ""
+        assert status == 0
+        assert "404" in error
+
+
+class TestHttpFetcher:
+    @pytest.mark.asyncio
+    async def test_fetch_runs_concurrently(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        from app.fetcher import HttpFetcher
+        
+        async def slow(request):
+            await asyncio.sleep(0.2)
+            return web.Response(text="<html>ok</html>", content_type="text/html")
+        
+        app = web.Application()
+        app.router.add_get("/slow", slow)
+        fetcher = HttpFetcher()
+        
+        async with TestServer(app) as server:
+            url = str(server.make_url("/slow"))
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            responses = await asyncio.gather(*[fetcher.fetch(url) for _ in range(4)])
+            elapsed = loop.time() - started
+            await fetcher.close()
+        
+        assert all(r["status_code"] == 200 and r["content"] == "<html>ok</html>" for r in responses)
+        assert elapsed < 0.6
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts_opened = 0
+        self.contexts = []
+    
+    def is_connected(self):
+        return self.connected
+    
+    async def new_context(self, **kwargs):
+        self.contexts_opened += 1
+        page = AsyncMock()
+        page.evaluate.return_value = 0
+        context = AsyncMock()
+        context.new_page.return_value = page
+        self.contexts.append(context)
+        return context
+    
+    async def new_browser_cdp_session(self):
+        session = AsyncMock()
+        session.send.return_value = {"processInfo": [{"type": "browser", "id": os.getpid(), "cpuTime": 0}]}
+        return session
+    
+    async def close(self):
+        self.connected = False
+
+
+class TestBrowserPool:
+    @pytest.fixture
+    def launched(self):
+        browsers = []
+        
+        def launch(**kwargs):
+            browsers.append(FakeBrowser())
+            return browsers[-1]
+        
+        playwright = AsyncMock()
+        playwright.chromium.launch.side_effect = launch
+        starter = Mock()
+        starter.start = AsyncMock(return_value=playwright)
+        with patch('app.browser_pool.async_playwright', return_value=starter):
+            yield browsers
+    
+    @pytest.mark.asyncio
+    async def test_reuses_browser_across_pages(self, launched):
+        from app.browser_pool import BrowserPool
+        pool = BrowserPool(size=1)
+        
+        for _ in range(3):
+            async with pool.page() as page:
+                assert page is not None
+        
+        assert len(launched) == 1
+        assert launched[0].contexts_opened == 3
+        await pool.close()
+    
+    @pytest.mark.asyncio
+    async def test_recycles_after_max_pages(self, launched):
+        from app.browser_pool import BrowserPool
+        pool = BrowserPool(size=1)
+        
+        with patch('app.browser_pool.settings.browser_max_pages', 2):
+            for _ in range(3):
+                async with pool.page():
+                    pass
+        
+        assert len(launched) == 2
+        assert launched[0].connected == False
+        await pool.close()
+    
+    @pytest.mark.asyncio
+    async def test_recycles_when_browser_processes_exceed_memory_ceiling(self, launched):
+        from app.browser_pool import BrowserPool, process_rss_mb
+        pool = BrowserPool(size=1)
+        assert process_rss_mb([os.getpid()]) > 0
+        assert process_rss_mb([-1]) == 0
+        
+        async with pool.page():
+            pass
+        assert 0 < pool._slots._queue[0].memory_mb
+        
+        with patch('app.browser_pool.settings.browser_max_memory_mb', 1):
+            async with pool.page():
+                pass
+        
+        assert len(launched) == 2
+        assert launched[0].connected == False
+        await pool.close()
+    
+    @pytest.mark.asyncio
+    async def test_restarts_crashed_browser(self, launched):
+        from app.browser_pool import BrowserPool
+        pool = BrowserPool(size=1)
+        
+        with pytest.raises(RuntimeError):
+            async with pool.page():
+                launched[0].connected = False
+                raise RuntimeError("Target closed")
+        
+        async with pool.page():
+            pass
+        
+        assert len(launched) == 2
+        await pool.close()
+    
+    @pytest.mark.asyncio
+    async def test_blocks_heavy_resources_when_requested(self, launched):
+        from app.browser_pool import BrowserPool
+        pool = BrowserPool(size=1)
+        
+        async with pool.page():
+            pass
+        async with pool.page(block_resources=True):
+            pass
+        
+        assert launched[0].contexts[0].route.await_count == 0
+        launched[0].contexts[1].route.assert_awaited_once_with("**/*", pool._route)
+        assert pool.should_block("image", "https://example.com/logo.png")
+        assert pool.should_block("script", "https://www.google-analytics.com/analytics.js")
+        assert pool.should_block("xhr", "https://px.ads.linkedin.com/collect")
+        assert not pool.should_block("document", "https://www.linkedin.com/company/test")
+        assert not pool.should_block("script", "https://static.licdn.com/app.js")
+        
+        route = AsyncMock()
+        route.request = Mock(resource_type="font", url="https://example.com/font.woff2")
+        await pool._route(route)
+        route.abort.assert_awaited_once()
+        route.continue_.assert_not_called()
+        await pool.close()
+
+
+class TestFetchResilience:
+    @pytest.fixture
+    def scraper(self):
+        scraper = WebScraper()
+        scraper.resilience.backoff_base = 0
+        with patch('app.politeness.settings.domain_requests_per_second', 1000.0):
+            yield scraper
+    
+    def test_classify_exception(self):
+        import socket
+        import aiohttp
+        from app.resilience import classify_exception, FetchError
+        
+        def response_error(status):
+            return aiohttp.ClientResponseError(Mock(real_url="https://a.com"), (), status=status)
+        
+        key = Mock(host="a-investimentos.com.br", port=443, ssl=True)
+        assert classify_exception(aiohttp.ClientConnectorError(key, socket.gaierror(-2, "Name or service not known"))) == "dns"
+        assert classify_exception(aiohttp.ClientConnectorError(key, socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution"))) == "connection"
+        assert classify_exception(aiohttp.ClientConnectorError(key, ConnectionRefusedError(111, "refused"))) == "connection"
+        assert classify_exception(aiohttp.ServerTimeoutError("Connection timeout to host https://a.com")) == "connect_timeout"
+        assert classify_exception(asyncio.TimeoutError()) == "timeout"
+        assert classify_exception(response_error(429)) == "rate_limited"
+        assert classify_exception(response_error(503)) == "http_5xx"
+        assert classify_exception(response_error(404)) == "http_4xx"
+        assert classify_exception(Exception("page.goto: net::ERR_NAME_NOT_RESOLVED at https://a.com")) == "dns"
+        assert classify_exception(FetchError("HTTP 999", "http_4xx")) == "http_4xx"
+        assert classify_exception(ValueError("boom")) == "unknown"
+    
+    @pytest.mark.asyncio
+    async def test_retries_transient_status_until_success(self, scraper):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        calls = []
+        
+        async def flaky(request):
+            calls.append(request.path)
+            if len(calls) < 3:
+                return web.Response(status=503, headers={"Retry-After": "0"})
+            return web.Response(text="<p>ok</p>", content_type="text/html")
+        
+        app = web.Application()
+        app.router.add_get("/flaky", flaky)
+        app.router.add_get("/missing", lambda request: calls.append(request.path) or web.Response(status=404))
+        
+        async with TestServer(app) as server:
+            content, status, error, _ = await scraper.fetch_page(str(server.make_url("/flaky")))
+            assert (content, status, error) == ("<p>ok</p>", 200, "")
+            assert len(calls) == 3
+            
+            calls.clear()
+            _, status, _, headers = await scraper.fetch_page(str(server.make_url("/missing")))
+            await scraper.close()
+        
+        assert status == 0
+        assert headers == {"x-error-class": "http_4xx"}
+        assert calls == ["/missing"]
+    
+    @pytest.mark.asyncio
+    async def test_negative_cache_fails_fast_for_unresolvable_host(self, scraper):
+        import socket
+        import aiohttp
+        key = Mock(host="a-investimentos.com.br", port=443, ssl=True)
+        failure = aiohttp.ClientConnectorError(key, socket.gaierror(-2, "Name or service not known"))
+        
+        scraper.resilience.negative_threshold = 2
+        with patch.object(scraper, '_scrape_with_requests', side_effect=failure) as mock_fetch:
+            first = await scraper.fetch_page("https://www.a-investimentos.com.br")
+            assert scraper.resilience.stats()["negative_cached_domains"] == 0
+            second = await scraper.fetch_page("https://a-investimentos.com.br/sobre")
+            third = await scraper.fetch_page("https://a-investimentos.com.br/contato")
+        
+        assert mock_fetch.call_count == 2
+        assert first[3] == second[3] == third[3] == {"x-error-class": "dns"}
+        assert "(cached)" in third[2]
+        assert scraper.resilience.stats()["negative_cached_domains"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_circuit_breaker_opens_and_half_opens(self, scraper):
+        import aiohttp
+        failure = aiohttp.ClientResponseError(Mock(real_url="https://down.com"), (), status=502)
+        scraper.resilience.max_retries = 0
+        
+        with patch('app.resilience.settings.circuit_breaker_threshold', 2), \
+             patch.object(scraper, '_scrape_with_requests', side_effect=failure) as mock_fetch:
+            for _ in range(3):
+                _, _, error, headers = await scraper.fetch_page("https://down.com")
+        
+        assert mock_fetch.call_count == 2
+        assert headers == {"x-error-class": "circuit_open"}
+        
+        scraper.resilience.breaker("down.com").reset_seconds = 0
+        with patch.object(scraper, '_scrape_with_requests', return_value=("<p>ok</p>", 200, {})):
+            content, status, _, _ = await scraper.fetch_page("https://down.com")
+        
+        assert (content, status) == ("<p>ok</p>", 200)
+        assert scraper.resilience.breaker("down.com").state == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_half_open_circuit(self, scraper):
+        breaker = scraper.resilience.breaker("down.com")
+        breaker.opened_at, breaker.failures, breaker.reset_seconds = 0.0, 5, 0
+        started = asyncio.Event()
+        
+        async def hang(url, headers):
+            started.set()
+            await asyncio.sleep(10)
+        
+        with patch.object(scraper, '_scrape_with_requests', side_effect=hang):
+            probe = asyncio.create_task(scraper.fetch_page("https://down.com"))
+            await started.wait()
+            probe.cancel()
+            await asyncio.gather(probe, return_exceptions=True)
+        
+        assert breaker.probing is False
+        with patch.object(scraper, '_scrape_with_requests', return_value=("<p>ok</p>", 200, {})):
+            content, status, _, _ = await scraper.fetch_page("https://down.com")
+        
+        assert (content, status) == ("<p>ok</p>", 200)
+        assert breaker.state == "closed"
+    
+    @pytest.mark.asyncio
+    async def test_connection_reset_is_not_negatively_cached(self, scraper):
+        import aiohttp
+        scraper.resilience.max_retries = 0
+        
+        with patch.object(scraper, '_scrape_with_requests', side_effect=aiohttp.ServerDisconnectedError()) as mock_fetch:
+            first = await scraper.fetch_page("https://www.linkedin.com/company/a")
+            second = await scraper.fetch_page("https://www.linkedin.com/company/b")
+        
+        assert mock_fetch.call_count == 2
+        assert first[3] == second[3] == {"x-error-class": "connection"}
+        assert scraper.resilience.stats()["negative_cached_domains"] == 0
+
+
+class TestFocusedCrawler:
+    def test_score_link_prefers_institutional_pages(self):
+        from app.crawler import score_link
+        
+        assert score_link("https://gestora.com.br/quem-somos") > 0
+        assert score_link("https://gestora.com.br/p?id=7", "Patrimônio sob gestão") > score_link("https://gestora.com.br/sobre")
+        assert score_link("https://gestora.com.br/blog/fundos-imobiliarios") < 0
+        assert score_link("https://gestora.com.br/politica-de-privacidade", "Privacidade") < 0
+    
+    def test_frontier_ranks_dedupes_and_respects_budget(self):
+        from urllib.robotparser import RobotFileParser
+        from app.crawler import CrawlFrontier
+        html = """
+        <a href="/blog/post-1">Blog</a>
+        <a href="/quem-somos#time">Quem Somos</a>
+        <a href="https://www.gestora.com.br/quem-somos/">Quem somos</a>
+        <a href="/institucional">Institucional</a>
+        <a href="/relatorio-anual.pdf">Sobre a gestora (PDF)</a>
+        <a href="https://outra.com.br/sobre">Sobre</a>
+        <a href="mailto:contato@gestora.com.br">Contato</a>
+        """
+        frontier = CrawlFrontier("https://www.gestora.com.br/", max_pages=2, max_depth=1)
+        frontier.add_links("https://www.gestora.com.br/", html)
+        robots = RobotFileParser()
+        robots.parse(["User-agent: *", "Disallow: /institucional"])
+        frontier.seed(robots, ["https://gestora.com.br/sobre-nos", "https://gestora.com.br/quem-somos"])
+        
+        assert frontier.pop() == "https://gestora.com.br/sobre-nos"
+        assert frontier.pop() == "https://www.gestora.com.br/quem-somos"
+        assert frontier.pop() is None
+        
+        frontier.add_links("https://www.gestora.com.br/quem-somos", '<a href="/quem-somos/historia">Nossa história</a>')
+        assert "gestora.com.br/quem-somos/historia" not in frontier.seen
+    
+    @pytest.mark.asyncio
+    async def test_scrape_company_crawls_to_aum_page(self, session_factory, sqlite_db, isolated_bulk_writer):
+        service = ScrapingService(session_factory)
+        company = Company(name="Gestora", url_site="https://www.gestora.com.br/")
+        sqlite_db.add(company)
+        await sqlite_db.commit()
+        
+        pages = {
+            "https://www.gestora.com.br/robots.txt": "User-agent: *\nDisallow: /privado\n",
+            "https://www.gestora.com.br/sitemap.xml": (
+                '<?xml version="1.0" encoding="UTF-8"?>'
+                '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                '<url><loc>https://www.gestora.com.br/privado/numeros</loc></url>'
+                '<url><loc>https://www.gestora.com.br/contato</loc></url>'
+                '</urlset>'
+            ),
+            "https://www.gestora.com.br/": (
+                '<html><body><p>Bem-vindo à gestora, invista com a gente desde 1998</p>'
+                '<a href="/blog">Blog</a><a href="/quem-somos">Quem Somos</a></body></html>'
+            ),
+            "https://www.gestora.com.br/quem-somos": "<html><body><p>Hoje temos R$ 4,2 bilhões sob gestão</p></body></html>",
+        }
+        fetched = []
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            fetched.append(url)
+            return (pages[url], 200, "", {}) if url in pages else ("", 0, "HTTP 404", {"x-error-class": "http_4xx"})
+        
+        with patch('app.scraper.scraper.fetch_page', side_effect=fetch), \
+             patch('app.ai_extractor.ai_extractor.extract_aum', return_value={"aum_value": "NAO_DISPONIVEL", "is_available": False}):
+            result = await service.scrape_company(company)
+        
+        assert result["aum_found"] == True
+        assert result["aum_snapshots"][0]["source_url"] == "https://www.gestora.com.br/quem-somos"
+        assert [entry["url"] for entry in result["scraped_urls"]] == [
+            "https://www.gestora.com.br/", "https://www.gestora.com.br/quem-somos"
+        ]
+        assert "https://www.gestora.com.br/blog" not in fetched
+        assert "https://www.gestora.com.br/privado/numeros" not in fetched
+    
+    @pytest.mark.asyncio
+    async def test_rescrape_revisits_known_aum_page_when_home_is_unchanged(self, session_factory, sqlite_db, isolated_bulk_writer):
+        service = ScrapingService(session_factory)
+        company = Company(name="Gestora", url_site="https://www.gestora.com.br/")
+        sqlite_db.add(company)
+        await sqlite_db.commit()
+        
+        pages = {
+            "https://www.gestora.com.br/": '<html><body><p>Bem-vindo</p><a href="/quem-somos">Quem Somos</a></body></html>',
+            "https://www.gestora.com.br/quem-somos": "<html><body><p>Hoje temos R$ 4,2 bilhões sob gestão</p></body></html>",
+        }
+        fetched = []
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            fetched.append(url)
+            return (pages[url], 200, "", {}) if url in pages else ("", 0, "HTTP 404", {"x-error-class": "http_4xx"})
+        
+        with patch('app.scraper.scraper.fetch_page', side_effect=fetch), \
+             patch('app.ai_extractor.ai_extractor.extract_aum', return_value={"aum_value": "NAO_DISPONIVEL", "is_available": False}):
+            first = await service.scrape_company(company)
+            await isolated_bulk_writer.flush()
+            fetched.clear()
+            second = await service.scrape_company(company)
+        
+        assert first["aum_found"] == second["aum_found"] == True
+        assert second["aum_snapshots"][0]["source_url"] == "https://www.gestora.com.br/quem-somos"
+        assert second["aum_snapshots"][0]["cached"] == True
+        assert [(entry["url"], entry["status"]) for entry in second["scraped_urls"]] == [
+            ("https://www.gestora.com.br/", "unchanged"),
+            ("https://www.gestora.com.br/quem-somos", "unchanged"),
+        ]
+        assert "https://www.gestora.com.br/quem-somos" in fetched
+
+
+class TestDomainScheduler:
+    def test_domain_for(self):
+        from app.politeness import DomainScheduler
+        assert DomainScheduler.domain_for("https://www.Example.com.br/sobre") == "example.com.br"
+        assert DomainScheduler.domain_for("https://br.linkedin.com/company/x") == "br.linkedin.com"
+    
+    def test_rate_overrides_match_subdomains(self):
+        from app.politeness import DomainScheduler
+        scheduler = DomainScheduler()
+        with patch('app.politeness.settings.domain_rate_overrides', {"linkedin.com": 0.2}):
+            assert scheduler.rate_for("br.linkedin.com") == 0.2
+            assert scheduler.rate_for("notlinkedin.com") == scheduler.rate_for("example.com")
+    
+    @pytest.mark.asyncio
+    async def test_limits_inflight_per_domain_only(self):
+        from app.politeness import DomainScheduler
+        scheduler = DomainScheduler()
+        inflight = {}
+        peak = {}
+        
+        async def visit(url):
+            domain = scheduler.domain_for(url)
+            async with scheduler.slot(url):
+                inflight[domain] = inflight.get(domain, 0) + 1
+                peak[domain] = max(peak.get(domain, 0), inflight[domain])
+                await asyncio.sleep(0.05)
+                inflight[domain] -= 1
+        
+        urls = [f"https://site{i}.com" for i in range(5)] + ["https://linkedin.com/a"] * 3
+        with patch('app.politeness.settings.domain_max_inflight', 1), \
+             patch('app.politeness.settings.domain_requests_per_second', 100.0), \
+             patch('app.politeness.settings.domain_rate_overrides', {}):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*[visit(url) for url in urls])
+            elapsed = loop.time() - started
+        
+        assert peak["linkedin.com"] == 1
+        assert elapsed < 0.3
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_spaces_requests(self):
+        from app.politeness import TokenBucket
+        bucket = TokenBucket(rate=20.0, burst=1)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(3):
+            await bucket.acquire()
+        assert loop.time() - started >= 0.09
+
+
+class TestTokenizer:
+    def test_truncate_to_tokens_respects_budget(self):
+        from app.tokenizer import count_tokens, truncate_to_tokens
+        text = "patrimônio sob gestão " * 200
+        
+        truncated = truncate_to_tokens(text, 50)
+        
+        assert count_tokens(truncated) <= 51
+        assert truncate_to_tokens("curto", 50) == "curto"
+        assert truncate_to_tokens(text, 0) == ""
+    
+    def test_content_budget_leaves_room_for_prompt(self):
+        from app.tokenizer import count_tokens
+        extractor = AIExtractor()
+        budget = extractor.content_budget("Gestora")
+        messages = extractor.build_messages("Gestora", "R$ 1 bi sob gestão " * 2000)
+        
+        assert 0 < budget < extractor.max_tokens
+        assert sum(count_tokens(message["content"]) for message in messages) <= extractor.max_tokens
 
 
 class TestAIExtractor:
@@ -67,18 +794,770 @@ class TestAIExtractor:
         assert result["is_available"] == False
     
     @pytest.mark.asyncio
-    async def test_check_budget_and_run(self, ai_extractor):
-        mock_db = Mock()
-        mock_db.query.return_value.filter.return_value.first.return_value = None
+    async def test_extract_aum_stops_when_budget_is_exhausted(self, ai_extractor, sqlite_db, isolated_budget_governor):
+        isolated_budget_governor.limit_usd = 0.0
+        
+        with patch.object(ai_extractor, 'complete', new_callable=AsyncMock) as mock_complete:
+            result = await ai_extractor.extract_aum("Gestora", "AUM R$ 2.3 bi", "https://example.com", sqlite_db)
+        
+        assert result["error"] == "budget_exceeded"
+        assert mock_complete.call_count == 0
+
+
+class TestBudgetGovernor:
+    @pytest.fixture
+    def governor(self, session_factory):
+        from app.budget import BudgetGovernor, MemoryBudgetCounter
+        governor = BudgetGovernor(MemoryBudgetCounter(), session_factory)
+        governor.cost_per_1k = 0.01
+        return governor
+    
+    @pytest.mark.asyncio
+    async def test_reservations_never_exceed_limit(self, governor):
+        governor.limit_usd = 0.1
+        
+        reservations = await asyncio.gather(*[governor.reserve(1000) for _ in range(50)])
+        granted = [reservation for reservation in reservations if reservation]
+        
+        assert len(granted) == 10
+        assert governor.rejected == 40
+        
+        await governor.release(granted[0])
+        assert await governor.reserve(1000) is not None
+    
+    @pytest.mark.asyncio
+    async def test_seeds_from_usage_and_flushes_deltas(self, governor, sqlite_db):
+        from datetime import datetime
+        sqlite_db.add(Usage(date=datetime.now(), total_tokens=50000, cost_usd=0.5, requests_count=10))
+        await sqlite_db.commit()
+        
+        assert await governor.spent() == pytest.approx(0.5)
+        
+        await governor.record(1000)
+        await governor.record(1000)
+        assert await governor.spent() == pytest.approx(0.52)
+        assert await governor.flush() == 2
+        
+        usage = await sqlite_db.scalar(select(Usage).execution_options(populate_existing=True))
+        assert usage.total_tokens == 52000
+        assert usage.requests_count == 12
+        assert usage.cost_usd == pytest.approx(0.52)
+        assert await count_rows(sqlite_db, Usage) == 1
+
+
+class TestLlmResponseCache:
+    @pytest.fixture
+    def cache(self):
+        return LlmResponseCache()
+    
+    def test_key_normalizes_whitespace_and_case(self, cache):
+        first = cache.make_key("gpt-4o", [{"role": "user", "content": "Qual é o  AUM?\n"}])
+        second = cache.make_key("gpt-4o", [{"role": "user", "content": "qual é o aum?"}])
+        other_model = cache.make_key("gpt-4o-mini", [{"role": "user", "content": "qual é o aum?"}])
+        assert first == second
+        assert first != other_model
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_puts_upsert_one_row(self, cache, session_factory, sqlite_db):
+        from app.models import LlmCache
+        async def put(response):
+            async with session_factory() as db:
+                await cache.put("k", "gpt-4o", response, db)
+        
+        await asyncio.gather(put("R$ 1 bi"), put("R$ 2 bi"))
+        await put("R$ 3 bi")
+        
+        assert await count_rows(sqlite_db, LlmCache) == 1
+        assert (await sqlite_db.get(LlmCache, "k")).response == "R$ 3 bi"
+    
+    @pytest.mark.asyncio
+    async def test_hits_survive_memory_eviction(self, cache, sqlite_db):
+        cache.memory_entries = 1
+        await cache.put("a", "gpt-4o", "R$ 1 bi", sqlite_db)
+        await cache.put("b", "gpt-4o", "R$ 2 bi", sqlite_db)
+        
+        assert await cache.get("a", sqlite_db) == "R$ 1 bi"
+        assert await cache.get("missing", sqlite_db) is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_prune_enforces_size_and_ttl(self, cache, sqlite_db):
+        from app.models import LlmCache
+        from datetime import datetime, timedelta
+        cache.max_entries = 2
+        now = datetime.utcnow()
+        for age, key in enumerate(["d", "c", "b", "a"]):
+            await cache.put(key, "gpt-4o", "NAO_DISPONIVEL", sqlite_db)
+            await sqlite_db.execute(update(LlmCache).where(LlmCache.key == key).values(last_accessed_at=now - timedelta(minutes=age)))
+        await sqlite_db.execute(update(LlmCache).where(LlmCache.key == "d").values(created_at=now - timedelta(days=365)))
+        await sqlite_db.commit()
+        
+        await cache.prune(sqlite_db)
+        
+        assert set((await sqlite_db.scalars(select(LlmCache.key))).all()) == {"c", "b"}
+    
+    @pytest.mark.asyncio
+    async def test_extract_aum_uses_cache(self, sqlite_db):
+        extractor = AIExtractor()
+        
+        with patch('app.ai_extractor.llm_cache', LlmResponseCache()), \
+             patch('app.ai_extractor.llm_gateway.complete', new_callable=AsyncMock) as mock_create:
+            mock_create.return_value = ("R$ 2.3 bi", 120)
+            first = await extractor.extract_aum("Gestora", "AUM R$ 2.3 bi", "https://example.com", sqlite_db)
+            second = await extractor.extract_aum("Gestora", "AUM R$ 2.3 bi", "https://example.com", sqlite_db)
+            await extractor.extract_aum("Gestora", "AUM R$ 2.3 bi", "https://example.com", sqlite_db, bypass_cache=True)
+        
+        assert first["aum_numeric"] == second["aum_numeric"] == 2.3e9
+        assert mock_create.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_extract_aum_survives_cache_write_failure(self, sqlite_db):
+        extractor = AIExtractor()
+        
+        with patch('app.ai_extractor.settings.llm_batch_enabled', False), \
+             patch('app.ai_extractor.llm_cache.put', side_effect=RuntimeError("UNIQUE constraint failed")), \
+             patch('app.ai_extractor.llm_gateway.complete', new_callable=AsyncMock, return_value=("R$ 2.3 bi", 120)):
+            result = await extractor.extract_aum("Gestora", "AUM R$ 2.3 bi", "https://example.com", sqlite_db, bypass_cache=True)
+        
+        assert result["aum_numeric"] == 2.3e9
+        assert "error" not in result
+
+
+class TestExtractionBatcher:
+    @pytest.fixture
+    def extractor(self):
+        return AIExtractor()
+    
+    def test_parse_batch_response(self, extractor):
+        answers = extractor.batcher.parse_batch_response(
+            'Aqui está: [{"id": 0, "aum": "R$ 2,3 bi"}, {"id": 1, "aum": "NAO_DISPONIVEL"}, {"id": 9, "aum": "x"}]', 2
+        )
+        assert answers == {0: "R$ 2,3 bi", 1: "NAO_DISPONIVEL"}
+        assert extractor.batcher.parse_batch_response("não sei", 2) == {}
+    
+    @pytest.mark.asyncio
+    async def test_packs_concurrent_requests_into_one_call(self, extractor):
+        extractor.complete = AsyncMock(return_value=(
+            '[{"id": 0, "aum": "R$ 1 bi"}, {"id": 1, "aum": "R$ 2 bi"}, {"id": 2, "aum": "NAO_DISPONIVEL"}]', 300
+        ))
+        
+        with patch('app.llm_batcher.settings.llm_batch_linger_seconds', 0.01):
+            answers = await asyncio.gather(*[
+                extractor.batcher.submit(f"Gestora {i}", "conteúdo") for i in range(3)
+            ])
+        
+        assert answers == ["R$ 1 bi", "R$ 2 bi", "NAO_DISPONIVEL"]
+        assert extractor.complete.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_single_calls_on_bad_batch(self, extractor):
+        extractor.complete = AsyncMock(return_value=('[{"id": 0, "aum": "R$ 1 bi"}', 100))
+        extractor.complete_single = AsyncMock(side_effect=["R$ 1 bi", "R$ 2 bi"])
+        
+        with patch('app.llm_batcher.settings.llm_batch_linger_seconds', 0.01):
+            answers = await asyncio.gather(*[
+                extractor.batcher.submit(f"Gestora {i}", "conteúdo") for i in range(2)
+            ])
+        
+        assert answers == ["R$ 1 bi", "R$ 2 bi"]
+        assert extractor.complete_single.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_flushes_when_token_budget_is_reached(self, extractor):
+        extractor.complete = AsyncMock(return_value=('[{"id": 0, "aum": "R$ 1 bi"}, {"id": 1, "aum": "R$ 1 bi"}]', 100))
+        
+        with patch('app.llm_batcher.settings.llm_batch_token_budget', 300), \
+             patch('app.llm_batcher.settings.llm_batch_linger_seconds', 0.01):
+            await asyncio.gather(*[
+                extractor.batcher.submit(f"Gestora {i}", "x" * 500) for i in range(4)
+            ])
+        
+        assert extractor.complete.call_count == 2
+
+
+class TestLlmGateway:
+    @pytest.fixture
+    def gateway(self):
+        from app.llm_gateway import LlmGateway
+        gateway = LlmGateway()
+        gateway.backoff_base = 0
+        return gateway
+    
+    def completion(self, content, total_tokens=42):
+        return {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": total_tokens - 2, "completion_tokens": 2, "total_tokens": total_tokens}
+        }
+    
+    def test_parse_duration(self):
+        from app.llm_gateway import parse_duration
+        assert parse_duration("6m0s") == 360.0
+        assert parse_duration("1.5s") == 1.5
+        assert parse_duration("20ms") == 0.02
+        assert parse_duration(None) is None
+        assert parse_duration("soon") is None
+    
+    @pytest.mark.asyncio
+    async def test_adaptive_limiter_grows_and_halves(self):
+        from app.llm_gateway import AdaptiveLimiter
+        limiter = AdaptiveLimiter(2, 1, 4)
+        
+        for _ in range(2):
+            await limiter.on_success()
+        assert limiter.limit == 3
+        await limiter.on_success(headroom=False)
+        assert limiter.limit == 3
+        
+        limiter.on_throttle()
+        assert limiter.limit == 1
+        limiter.on_throttle()
+        assert limiter.limit == 1
+        
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        assert limiter.in_flight == 1
+    
+    @pytest.mark.asyncio
+    async def test_retries_rate_limit_against_stub_server(self, gateway):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        calls = []
+        
+        async def chat(request):
+            calls.append(await request.json())
+            if len(calls) == 1:
+                return web.json_response(
+                    {"error": {"message": "slow down", "type": "requests", "code": "rate_limit_exceeded"}},
+                    status=429,
+                    headers={"retry-after-ms": "10"}
+                )
+            return web.json_response(self.completion(" R$ 2,3 bi "), headers={
+                "x-ratelimit-limit-requests": "500",
+                "x-ratelimit-remaining-requests": "499",
+                "x-ratelimit-limit-tokens": "30000",
+                "x-ratelimit-remaining-tokens": "29000",
+                "x-ratelimit-reset-tokens": "2s"
+            })
+        
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat)
+        
+        async with TestServer(app) as server:
+            gateway.base_url = str(server.make_url("/v1"))
+            messages = [{"role": "user", "content": "AUM?"}]
+            content, tokens = await gateway.complete("gpt-4o", messages, 50)
+            await gateway.close()
+        
+        stats = gateway.stats()
+        assert (content, tokens) == ("R$ 2,3 bi", 42)
+        assert len(calls) == 2
+        assert calls[0]["messages"] == messages and calls[0]["max_tokens"] == 50
+        assert stats["requests"] == 2
+        assert stats["retries"] == 1
+        assert stats["rate_limited"] == 1
+        assert stats["tokens"] == 42
+        assert stats["concurrency_limit"] == 4
+        assert stats["in_flight"] == 0
+        assert stats["rate_limits"]["remaining_tokens"] == 29000
+        assert stats["rate_limits"]["reset_tokens_seconds"] == 2.0
+    
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self, gateway):
+        import openai
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        calls = []
+        
+        async def chat(request):
+            calls.append(request.path)
+            return web.json_response({"error": {"message": "bad request", "type": "invalid_request_error"}}, status=400)
+        
+        async def quota(request):
+            calls.append(request.path)
+            return web.json_response({"error": {"message": "no quota", "type": "insufficient_quota", "code": "insufficient_quota"}}, status=429)
+        
+        bad = web.Application()
+        bad.router.add_post("/v1/chat/completions", chat)
+        broke = web.Application()
+        broke.router.add_post("/v1/chat/completions", quota)
+        
+        async with TestServer(bad) as server:
+            gateway.base_url = str(server.make_url("/v1"))
+            with pytest.raises(openai.BadRequestError):
+                await gateway.complete("gpt-4o", [{"role": "user", "content": "AUM?"}], 50)
+            await gateway.close()
+        
+        async with TestServer(broke) as server:
+            gateway.base_url = str(server.make_url("/v1"))
+            with pytest.raises(openai.RateLimitError):
+                await gateway.complete("gpt-4o", [{"role": "user", "content": "AUM?"}], 50)
+            await gateway.close()
+        
+        assert len(calls) == 2
+        assert gateway.stats()["retries"] == 0
+        assert gateway.stats()["failures"] == 2
+
+
+class TestHeuristicAumExtractor:
+    @pytest.fixture
+    def extractor(self):
+        from app.heuristics import HeuristicAumExtractor
+        return HeuristicAumExtractor()
+    
+    def test_confident_match_near_keyword(self, extractor):
+        result = extractor.extract("A gestora possui R$ 2,3 bilhões sob gestão.", "https://example.com")
+        from app.config import settings
+        assert result["aum_numeric"] == 2.3e9
+        assert result["confidence_score"] >= settings.heuristic_confidence_threshold
+        assert result["confidence_score"] >= settings.early_exit_confidence
+        assert result["confidence_score"] > AIExtractor().parse_aum_response("R$ 2,3 bi", "https://example.com")["confidence_score"]
+        assert result["source_type"] == "heuristic_extraction"
+    
+    def test_parse_number_separators(self, extractor):
+        assert extractor.parse_number("2,3") == 2.3
+        assert extractor.parse_number("1.500") == 1500
+        assert extractor.parse_number("1.234,5") == 1234.5
+        assert extractor.parse_number("4.5") == 4.5
+    
+    def test_ambiguous_pages_stay_below_threshold(self, extractor):
+        from app.config import settings
+        threshold = settings.heuristic_confidence_threshold
+        assert extractor.extract("Aumento de 3 mi em vendas", "https://example.com")["confidence_score"] < threshold
+        assert extractor.extract("Temos 2,3 bilhões sob gestão", "https://example.com")["confidence_score"] < threshold
+        conflicting = extractor.extract("AUM de R$ 2 bi em 2020 e AUM de R$ 5 bi em 2023", "https://example.com")
+        assert conflicting["confidence_score"] < threshold
+        assert extractor.extract("Sem números aqui", "https://example.com") is None
+    
+    @pytest.mark.asyncio
+    async def test_confident_heuristic_skips_llm(self, session_factory):
+        service = ScrapingService(session_factory)
+        company = Company(id=1, name="Gestora", url_site="https://example.com")
+        
+        with patch('app.scraper.scraper.fetch_page', return_value=("<p>Temos R$ 2,3 bilhões sob gestão</p>", 200, "", {})), \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            result = await service.scrape_company(company)
+        
+        assert mock_ai.call_count == 0
+        assert result["aum_snapshots"][0]["aum_numeric"] == 2.3e9
+    
+    @pytest.mark.asyncio
+    async def test_confident_heuristic_stops_fan_out(self, session_factory):
+        service = ScrapingService(session_factory)
+        company = Company(id=1, name="Gestora", url_site="https://example.com", url_linkedin="https://www.linkedin.com/company/gestora")
+        
+        async def fetch(url, use_playwright=False, headers=None):
+            if "linkedin" in url:
+                await asyncio.sleep(10)
+            return ("<p>Temos R$ 2,3 bilhões sob gestão</p>", 200, "", {})
+        
+        with patch('app.scraper.scraper.fetch_page', side_effect=fetch), \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            result = await asyncio.wait_for(service.scrape_company(company), 2)
+        
+        assert mock_ai.call_count == 0
+        assert {"url": "https://www.linkedin.com/company/gestora", "status": "cancelled"} in result["scraped_urls"]
+
+
+class TestBulkWriter:
+    @pytest.mark.asyncio
+    async def test_flush_writes_buffered_rows_in_one_transaction(self, isolated_bulk_writer, sqlite_db):
+        sqlite_db.add(Company(id=1, name="A"))
+        await sqlite_db.commit()
+        
+        for i in range(3):
+            isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": f"https://a.com/{i}", "status": "success"})
+        isolated_bulk_writer.add(AumSnapshot, {
+            "company_id": 1, "aum_value": "R$ 1 bi", "source_url": "https://a.com/0", "source_type": "website"
+        })
+        
+        assert await count_rows(sqlite_db, ScrapeLog) == 0
+        assert await isolated_bulk_writer.flush() == 4
+        assert await count_rows(sqlite_db, ScrapeLog) == 3
+        assert (await sqlite_db.scalar(select(AumSnapshot))).created_at is not None
+        assert isolated_bulk_writer.pending == 0
+    
+    @pytest.mark.asyncio
+    async def test_flushes_when_batch_is_full(self, isolated_bulk_writer, sqlite_db):
+        with patch.object(isolated_bulk_writer, 'batch_size', 2):
+            isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": "https://a.com", "status": "success"})
+            isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": "https://b.com", "status": "failed"})
+            await asyncio.gather(*isolated_bulk_writer._pending_flushes)
+        
+        assert await count_rows(sqlite_db, ScrapeLog) == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_rows(self, isolated_bulk_writer):
+        isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": "https://a.com", "status": "success"})
+        
+        with patch.object(isolated_bulk_writer, '_write', side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                await isolated_bulk_writer.flush()
+        
+        assert isolated_bulk_writer.pending == 1
+    
+    @pytest.mark.asyncio
+    async def test_close_flushes_and_stops_timer(self, isolated_bulk_writer, sqlite_db):
+        isolated_bulk_writer.start()
+        isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": "https://a.com", "status": "success"})
+        
+        await isolated_bulk_writer.close()
+        
+        assert await count_rows(sqlite_db, ScrapeLog) == 1
+        assert isolated_bulk_writer._flusher is None
+    
+    @pytest.mark.asyncio
+    async def test_page_cache_is_written_with_snapshot(self, isolated_bulk_writer, sqlite_db):
+        from app.models import PageCache
+        from app.page_cache import page_cache
+        sqlite_db.add(Company(id=1, name="A"))
+        await sqlite_db.commit()
+        
+        page_cache.store(1, "https://a.com", {"etag": '"v1"'}, "h1")
+        isolated_bulk_writer.add(AumSnapshot, {
+            "company_id": 1, "aum_value": "R$ 1 bi", "source_url": "https://a.com", "source_type": "website"
+        })
+        assert await page_cache.get(1, "https://a.com", sqlite_db) is None
+        
+        with patch.object(isolated_bulk_writer, '_write', side_effect=RuntimeError("db down")):
+            with pytest.raises(RuntimeError):
+                await isolated_bulk_writer.flush()
+        assert await page_cache.get(1, "https://a.com", sqlite_db) is None
+        
+        page_cache.store(1, "https://a.com", {"etag": '"v2"'}, "h2")
+        await isolated_bulk_writer.flush()
+        
+        entry = await sqlite_db.scalar(select(PageCache).execution_options(populate_existing=True))
+        assert (entry.etag, entry.content_hash) == ('"v2"', "h2")
+        assert await count_rows(sqlite_db, PageCache) == 1
+        assert await count_rows(sqlite_db, AumSnapshot) == 1
+        
+        page_cache.store(1, "https://a.com", {}, "h3")
+        await isolated_bulk_writer.flush()
+        entry = await sqlite_db.scalar(select(PageCache).execution_options(populate_existing=True))
+        assert (entry.etag, entry.content_hash) == (None, "h3")
+
+
+class TestCompanyImporter:
+    @pytest.fixture
+    def importer(self):
+        from app.importer import CompanyImporter
+        return CompanyImporter(chunk_size=2)
+    
+    @pytest.mark.asyncio
+    async def test_import_upserts_on_name(self, importer, sqlite_db):
+        import io
+        csv_content = (
+            "Name,URL_Site,url_linkedin\n"
+            "Alpha ,https://alpha.com,\n"
+            "Beta,ftp://beta.com,https://linkedin.com/beta\n"
+            ",https://orphan.com,\n"
+            "Alpha,,https://linkedin.com/alpha\n"
+            "Gestora,www.gestora.com.br,linkedin.com/company/gestora\n"
+        )
+        
+        counts = await importer.import_csv(io.BytesIO(csv_content.encode()), sqlite_db)
+        
+        assert counts == {"rows": 5, "inserted": 3, "updated": 1, "skipped": 1, "duplicates": 0, "invalid_urls": 1}
+        companies = {company.name: company for company in (await sqlite_db.scalars(select(Company))).all()}
+        assert set(companies) == {"Alpha", "Beta", "Gestora"}
+        assert companies["Alpha"].url_site == "https://alpha.com"
+        assert companies["Alpha"].url_linkedin == "https://linkedin.com/alpha"
+        assert companies["Beta"].url_site is None
+        assert companies["Gestora"].url_site == "https://www.gestora.com.br"
+        assert companies["Gestora"].url_linkedin == "https://linkedin.com/company/gestora"
+        
+        counts = await importer.import_csv(io.BytesIO(csv_content.encode()), sqlite_db)
+        
+        assert counts["inserted"] == 0
+        assert await count_rows(sqlite_db, Company) == 3
+    
+    @pytest.mark.asyncio
+    async def test_import_accepts_aliases_and_dedupes_chunks(self, importer, sqlite_db):
+        import io
+        importer.chunk_size = 10
+        csv_content = "Empresa\nGama\nGama\nDelta\n"
+        
+        counts = await importer.import_csv(io.BytesIO(csv_content.encode()), sqlite_db)
+        
+        assert counts == {"rows": 3, "inserted": 2, "updated": 0, "skipped": 0, "duplicates": 1, "invalid_urls": 0}
+    
+    @pytest.mark.asyncio
+    async def test_import_requires_name_column(self, importer, sqlite_db):
+        import io
+        with pytest.raises(Exception, match="name"):
+            await importer.import_csv(io.BytesIO(b"site\nhttps://a.com\n"), sqlite_db)
+
+
+class TestResultExporter:
+    @pytest_asyncio.fixture
+    async def exporter(self, session_factory, sqlite_db):
+        from datetime import datetime, timedelta
+        from app.exporter import ResultExporter
+        
+        sqlite_db.add_all([Company(id=1, name="Alpha", url_site="https://alpha.com"), Company(id=2, name="Beta")])
+        now = datetime.utcnow()
+        for age, value in [(2, "R$ 1 bi"), (1, "R$ 2 bi")]:
+            sqlite_db.add(AumSnapshot(
+                company_id=1, aum_value=value, aum_numeric=float(value[3]) * 1e9, aum_unit="bi",
+                source_url="https://alpha.com", source_type="website", confidence_score=0.9,
+                created_at=now - timedelta(days=age)
+            ))
+        await sqlite_db.commit()
+        
+        exporter = ResultExporter(session_factory)
+        exporter.batch_size = 1
+        return exporter
+    
+    async def collect(self, stream) -> bytes:
+        return b"".join([chunk async for chunk in stream])
+    
+    @pytest.mark.asyncio
+    async def test_csv_has_latest_snapshot_per_company(self, exporter):
+        import csv
+        import io
+        data = await self.collect(exporter.stream("csv"))
+        
+        rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+        assert [row["Company Name"] for row in rows] == ["Alpha", "Beta"]
+        assert rows[0]["AUM Value"] == "R$ 2 bi"
+        assert rows[1]["AUM Value"] == "NAO_DISPONIVEL"
+    
+    @pytest.mark.asyncio
+    async def test_parquet_applies_filters(self, exporter):
+        import io
+        import pyarrow.parquet as pq
+        data = await self.collect(exporter.stream("parquet", {"only_with_aum": True}))
+        
+        table = pq.read_table(io.BytesIO(data))
+        assert table.column("Company Name").to_pylist() == ["Alpha"]
+        assert table.column("AUM Numeric").to_pylist() == [2e9]
+        
+        data = await self.collect(exporter.stream("parquet", {"min_confidence": 0.95}))
+        assert pq.read_table(io.BytesIO(data)).num_rows == 0
+    
+    @pytest.mark.asyncio
+    async def test_xlsx_is_a_valid_workbook(self, exporter):
+        import io
+        from openpyxl import load_workbook
+        data = await self.collect(exporter.stream("xlsx"))
+        
+        rows = list(load_workbook(io.BytesIO(data)).active.values)
+        assert rows[0][0] == "Company Name"
+        assert [row[0] for row in rows[1:]] == ["Alpha", "Beta"]
+    
+    def test_rejects_unknown_format(self, exporter):
+        with pytest.raises(ValueError):
+            exporter.stream("pdf")
+
+
+class TestScrapeStats:
+    @pytest.mark.asyncio
+    async def test_flush_updates_counters_incrementally(self, isolated_bulk_writer, sqlite_db):
+        from app.stats import scrape_stats
+        sqlite_db.add(Company(id=1, name="A"))
+        await sqlite_db.commit()
+        
+        for source, status in [("website", "success"), ("website", "failed"), ("linkedin", "success")]:
+            isolated_bulk_writer.add(ScrapeLog, {"company_id": 1, "url": "https://a.com", "source_type": source, "status": status})
+        for _ in range(2):
+            isolated_bulk_writer.add(AumSnapshot, {
+                "company_id": 1, "aum_value": "R$ 1 bi", "source_url": "https://a.com", "source_type": "website"
+            })
+        await isolated_bulk_writer.flush()
+        
+        isolated_bulk_writer.add(AumSnapshot, {
+            "company_id": 1, "aum_value": "R$ 2 bi", "source_url": "https://a.com", "source_type": "website"
+        })
+        await isolated_bulk_writer.flush()
+        
+        status = scrape_stats.summarize(await scrape_stats.read(sqlite_db))
+        assert status["companies_with_aum"] == 1
+        assert status["total_scrapes"] == 3
+        assert status["successful_scrapes"] == 2
+        assert status["failed_scrapes"] == 1
+        assert status["by_source"]["website"] == {"scrapes": 2, "successful_scrapes": 1, "success_rate": 50.0}
+    
+    @pytest.mark.asyncio
+    async def test_reconcile_matches_table_counts(self, sqlite_db):
+        import io
+        from app.stats import scrape_stats
+        from app.importer import CompanyImporter
+        await CompanyImporter().import_csv(io.BytesIO(b"name\nA\nB\n"), sqlite_db)
+        sqlite_db.add(ScrapeLog(company_id=1, url="https://a.com", status="success"))
+        await sqlite_db.commit()
+        
+        assert (await scrape_stats.read(sqlite_db)) == {"total_companies": 2}
+        
+        await scrape_stats.reconcile(sqlite_db)
+        
+        status = scrape_stats.summarize(await scrape_stats.read(sqlite_db))
+        assert status["total_companies"] == 2
+        assert status["total_scrapes"] == 1
+        assert status["by_source"]["unknown"]["success_rate"] == 100.0
+
+
+class TestRescrapeScheduler:
+    @pytest.mark.asyncio
+    async def test_plan_prioritizes_stale_and_volatile_companies(self, sqlite_db):
+        from datetime import datetime, timedelta
+        from app.scheduler import RescrapeScheduler
+        now = datetime(2026, 1, 31)
+        
+        def snapshot(company_id, value, days_ago):
+            return AumSnapshot(
+                company_id=company_id, aum_value=str(value), aum_numeric=value, source_url="https://a.com",
+                source_type="website", created_at=now - timedelta(days=days_ago)
+            )
+        
+        sqlite_db.add_all([
+            Company(id=1, name="New", url_site="https://new.com"),
+            Company(id=2, name="Stable", url_site="https://stable.com"),
+            Company(id=3, name="Fresh", url_site="https://fresh.com"),
+            Company(id=4, name="Volatile", url_site="https://volatile.com"),
+            Company(id=5, name="Failing", url_site="https://failing.com"),
+            Company(id=6, name="Social", url_instagram="https://instagram.com/social"),
+            Company(id=7, name="Empty"),
+            snapshot(2, 1e9, 20), snapshot(2, 1e9, 10),
+            snapshot(3, 1e9, 1),
+            snapshot(4, 1e9, 9), snapshot(4, 2e9, 6), snapshot(4, 3e9, 3),
+            snapshot(6, 1e9, 20),
+        ])
+        sqlite_db.add_all([
+            ScrapeLog(company_id=5, url="https://failing.com", source_type="website", status="failed", created_at=now - timedelta(hours=hours))
+            for hours in (30, 20, 1)
+        ])
+        await sqlite_db.commit()
+        
+        scheduler = RescrapeScheduler()
+        plan = await scheduler.plan(sqlite_db, now)
+        
+        assert plan["companies"] == 7
+        assert [candidate["company_name"] for candidate in plan["selected"]] == ["New", "Volatile", "Stable", "Social"]
+        assert plan["selected"][1]["volatility"] == 1.0
+        assert plan["selected"][1]["refresh_interval_hours"] == 24
+        
+        scheduler.max_fetches = 2
+        plan = await scheduler.plan(sqlite_db, now)
+        assert [candidate["company_name"] for candidate in plan["selected"]] == ["New", "Volatile"]
+        assert plan["fetches"] == 2
+        
+        plan = await scheduler.plan(sqlite_db, now + timedelta(days=2))
+        assert "Failing" in [candidate["company_name"] for candidate in plan["selected"]]
+    
+    @pytest.mark.asyncio
+    async def test_plan_skips_companies_with_queued_job_items(self, sqlite_db):
+        from datetime import datetime
+        from app.models import ScrapeJob, ScrapeJobItem
+        from app.scheduler import RescrapeScheduler
+        sqlite_db.add_all([
+            Company(id=1, name="Queued", url_site="https://queued.com"),
+            Company(id=2, name="Done", url_site="https://done.com"),
+            ScrapeJob(id="job", status="running", total_companies=2),
+            ScrapeJobItem(job_id="job", company_id=1, status="queued"),
+            ScrapeJobItem(job_id="job", company_id=2, status="completed"),
+        ])
+        await sqlite_db.commit()
+        
+        plan = await RescrapeScheduler().plan(sqlite_db, datetime(2026, 1, 31))
+        
+        assert [candidate["company_name"] for candidate in plan["selected"]] == ["Done"]
+    
+    @pytest.mark.asyncio
+    async def test_failure_streak_counts_entry_fetches_per_source(self, sqlite_db):
+        from datetime import datetime, timedelta
+        from app.scheduler import RescrapeScheduler
+        now = datetime(2026, 1, 31)
+        sqlite_db.add_all([
+            Company(id=1, name="Crawled", url_site="https://crawled.com"),
+            Company(id=2, name="Mixed", url_site="https://mixed.com", url_linkedin="https://linkedin.com/mixed"),
+            Company(id=3, name="Down", url_site="https://down.com"),
+        ])
+        sqlite_db.add_all([
+            ScrapeLog(company_id=1, url="https://crawled.com", source_type="website", status="failed", created_at=now - timedelta(hours=1)),
+            *[
+                ScrapeLog(company_id=1, url=f"https://crawled.com/page{i}", source_type="website", status="failed", created_at=now - timedelta(hours=1))
+                for i in range(8)
+            ],
+            ScrapeLog(company_id=2, url="https://linkedin.com/mixed", source_type="linkedin", status="success", created_at=now - timedelta(days=10)),
+            *[
+                ScrapeLog(company_id=2, url="https://mixed.com", source_type="website", status="failed", created_at=now - timedelta(hours=hours))
+                for hours in (60, 40, 1)
+            ],
+            *[
+                ScrapeLog(company_id=3, url="https://down.com", source_type="website", status="failed", created_at=now - timedelta(hours=hours))
+                for hours in (60, 40, 1)
+            ],
+        ])
+        await sqlite_db.commit()
+        
+        scheduler = RescrapeScheduler()
+        rows = {row.id: row for row in (await sqlite_db.execute(scheduler.history_query())).all()}
+        assert rows[1].failure_streak == 1
+        assert rows[3].failure_streak == 3
+        
+        plan = await scheduler.plan(sqlite_db, now + timedelta(hours=12))
+        selected = {candidate["company_name"]: candidate for candidate in plan["selected"]}
+        assert selected["Crawled"]["failure_streak"] == 1
+        assert selected["Mixed"]["failure_streak"] == 0
+        assert "Down" not in selected
+    
+    @pytest.mark.asyncio
+    async def test_run_cycle_queues_selected_companies_in_priority_order(self, session_factory, sqlite_db):
+        from app.scheduler import RescrapeScheduler
+        sqlite_db.add_all([Company(id=1, name="A", url_site="https://a.com"), Company(id=2, name="B", url_site="https://b.com")])
+        await sqlite_db.commit()
+        
+        with patch('app.tasks.scrape_companies_task.delay') as mock_delay:
+            summary = await RescrapeScheduler(session_factory).run_cycle()
         
-        result = await ai_extractor.check_budget_and_run(mock_db)
-        assert result == True
+        assert summary["scheduled"] == 2
+        assert summary["job_id"] is not None
+        mock_delay.assert_called_once_with(summary["job_id"], [1, 2])
+
+
+class TestKeysetPagination:
+    @pytest.mark.asyncio
+    async def test_walks_pages_without_gaps_or_repeats(self, sqlite_db):
+        from datetime import datetime
+        from app.pagination import keyset_page
+        sqlite_db.add(Company(id=1, name="A"))
+        created_at = datetime(2024, 1, 1)
+        sqlite_db.add_all([
+            ScrapeLog(company_id=1, url=f"https://a.com/{i}", status="success", created_at=created_at if i < 3 else datetime(2024, 1, 2))
+            for i in range(5)
+        ])
+        await sqlite_db.commit()
+        
+        seen, cursor = [], None
+        while True:
+            page = await keyset_page(sqlite_db, select(ScrapeLog), [ScrapeLog.created_at, ScrapeLog.id], cursor, 2)
+            seen.extend(log.id for log in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        
+        assert seen == [5, 4, 3, 2, 1]
+    
+    @pytest.mark.asyncio
+    async def test_rejects_malformed_cursor(self, sqlite_db):
+        from app.pagination import keyset_page
+        with pytest.raises(ValueError):
+            await keyset_page(sqlite_db, select(Company), [Company.id], "not-a-cursor", 10)
 
 
 class TestScrapingService:
     @pytest.fixture
-    def service(self):
-        return ScrapingService()
+    def service(self, session_factory):
+        return ScrapingService(session_factory)
     
     @pytest.fixture
     def mock_company(self):
@@ -89,39 +1568,10 @@ class TestScrapingService:
             url_linkedin="https://linkedin.com/company/test"
         )
     
-    @pytest.mark.asyncio
-    async def test_load_companies_from_csv(self, service):
-        import tempfile
-        import os
-        
-        csv_content = "name,url_site,url_linkedin\nTest Company,https://example.com,https://linkedin.com/test"
-        
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as f:
-            f.write(csv_content)
-            csv_path = f.name
-        
-        try:
-            mock_db = Mock()
-            mock_db.add = Mock()
-            mock_db.commit = Mock()
-            mock_db.refresh = Mock()
-            
-            companies = await service.load_companies_from_csv(csv_path, mock_db)
-            
-            assert len(companies) == 1
-            assert companies[0].name == "Test Company"
-            
-        finally:
-            os.unlink(csv_path)
-    
     @pytest.mark.asyncio
     async def test_scrape_company(self, service, mock_company):
-        mock_db = Mock()
-        mock_db.add = Mock()
-        mock_db.commit = Mock()
-        
-        with patch('app.scraper.scraper.scrape_url') as mock_scrape:
-            mock_scrape.return_value = ("<html>Test content with AUM R$ 1.5 bi</html>", 200, "")
+        with patch('app.scraper.scraper.fetch_page') as mock_scrape:
+            mock_scrape.return_value = ("<html>Test content with AUM R$ 1.5 bi</html>", 200, "", {})
             
             with patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
                 mock_ai.return_value = {
@@ -134,13 +1584,312 @@ class TestScrapingService:
                     "source_type": "ai_extraction"
                 }
                 
-                result = await service.scrape_company(mock_company, mock_db)
+                result = await service.scrape_company(mock_company)
                 
                 assert result["company_id"] == 1
                 assert result["company_name"] == "Test Company"
                 assert len(result["scraped_urls"]) > 0
                 assert result["aum_found"] == True
 
+    
+    @pytest.mark.asyncio
+    async def test_scrape_company_fetches_sources_concurrently(self, service, mock_company):
+        mock_company.url_linkedin = None
+        mock_company.url_instagram = "https://instagram.com/test"
+        mock_company.url_x = "https://x.com/test"
+        
+        async def slow_scrape(url, use_playwright=False, headers=None):
+            await asyncio.sleep(0.1)
+            return "<html>Sem dados</html>", 200, "", {}
+        
+        with patch('app.scraper.scraper.fetch_page', side_effect=slow_scrape), \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            mock_ai.return_value = {"aum_value": "NAO_DISPONIVEL", "is_available": False}
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result = await service.scrape_company(mock_company)
+            elapsed = loop.time() - started
+        
+        assert len(result["scraped_urls"]) == 3
+        assert result["aum_found"] == False
+        assert elapsed < 0.25
+    
+    @pytest.mark.asyncio
+    async def test_scrape_company_early_exit(self, service, mock_company):
+        async def scrape(url, use_playwright=False, headers=None):
+            if "linkedin" in url:
+                await asyncio.sleep(5)
+            return "<html>Resultado recorde de 1.5 bi no ano</html>", 200, "", {}
+        
+        with patch('app.scraper.scraper.fetch_page', side_effect=scrape), \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            mock_ai.return_value = {
+                "aum_value": "R$ 1.5 bi",
+                "aum_numeric": 1.5e9,
+                "aum_unit": "bi",
+                "confidence_score": 0.9,
+                "is_available": True,
+                "source_url": "https://example.com",
+                "source_type": "ai_extraction"
+            }
+            result = await asyncio.wait_for(service.scrape_company(mock_company), timeout=1)
+        
+        statuses = {entry["url"]: entry["status"] for entry in result["scraped_urls"]}
+        assert result["aum_found"] == True
+        assert statuses["https://linkedin.com/company/test"] == "cancelled"
+        assert mock_ai.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_scrape_source_records_error_class(self, service, sqlite_db, isolated_bulk_writer):
+        from app.stats import scrape_stats
+        company = Company(name="Dead", url_site="https://www.a-investimentos.com.br")
+        sqlite_db.add(company)
+        await sqlite_db.commit()
+        
+        failure = ("", 0, "Cannot connect to host", {"x-error-class": "dns"})
+        with patch('app.scraper.scraper.fetch_page', return_value=failure):
+            result = await service.scrape_company(company)
+            await isolated_bulk_writer.flush()
+        
+        log = await sqlite_db.scalar(select(ScrapeLog))
+        assert log.error_class == "dns"
+        assert result["scraped_urls"][0]["error_class"] == "dns"
+        assert scrape_stats.summarize(await scrape_stats.read(sqlite_db))["by_error_class"] == {"dns": 1}
+    
+    @pytest.mark.asyncio
+    async def test_scrape_company_reuses_snapshot_for_unchanged_page(self, service, sqlite_db, isolated_bulk_writer):
+        from app.models import PageCache
+        company = Company(name="Cached", url_site="https://example.com")
+        sqlite_db.add(company)
+        await sqlite_db.commit()
+        
+        aum_info = {
+            "aum_value": "R$ 1.5 BI",
+            "aum_numeric": 1.5e9,
+            "aum_unit": "bi",
+            "confidence_score": 0.9,
+            "is_available": True,
+            "source_url": "https://example.com",
+            "source_type": "ai_extraction"
+        }
+        first = ("<html>AUM R$ 1.5 bi</html>", 200, "", {"etag": '"v1"'})
+        
+        with patch('app.scraper.scraper.fetch_page', return_value=first), \
+             patch('app.ai_extractor.ai_extractor.extract_aum', return_value=aum_info):
+            await service.scrape_company(company)
+            await isolated_bulk_writer.flush()
+        
+        entry = await sqlite_db.scalar(select(PageCache).where(PageCache.company_id == company.id))
+        assert entry.etag == '"v1"'
+        
+        with patch('app.scraper.scraper.fetch_page', return_value=("", 304, "", {})) as mock_fetch, \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            result = await service.scrape_company(company)
+        
+        assert mock_fetch.call_args.args[2] == {"If-None-Match": '"v1"'}
+        assert mock_ai.call_count == 0
+        assert result["scraped_urls"][0]["status"] == "unchanged"
+        assert result["aum_snapshots"][0]["aum_value"] == "R$ 1.5 BI"
+        assert await count_rows(sqlite_db, AumSnapshot) == 1
+        
+        with patch('app.scraper.scraper.fetch_page', return_value=first), \
+             patch('app.ai_extractor.ai_extractor.extract_aum') as mock_ai:
+            result = await service.scrape_company(company)
+        
+        assert mock_ai.call_count == 0
+        assert result["scraped_urls"][0]["status"] == "unchanged"
+    
+    @pytest.mark.asyncio
+    async def test_scrape_job_lifecycle(self, service, sqlite_db):
+        from app.models import ScrapeJob
+        sqlite_db.add_all([Company(name="A"), Company(name="B")])
+        await sqlite_db.commit()
+        
+        with patch('app.tasks.scrape_companies_task.delay') as mock_delay:
+            job = await service.create_scrape_job(None, sqlite_db)
+        
+        assert job.total_companies == 2
+        assert job.status == "queued"
+        assert mock_delay.call_count == 1
+        
+        job_id = job.id
+        company_ids = mock_delay.call_args.args[1]
+        await service.record_job_result(job_id, company_ids[0], {"company_id": company_ids[0], "aum_found": True}, sqlite_db)
+        sqlite_db.expire_all()
+        job = await sqlite_db.get(ScrapeJob, job_id)
+        assert job.status == "running"
+        assert job.successful_scrapes == 1
+        
+        await service.record_job_result(job_id, company_ids[1], {"company_id": company_ids[1], "error": "boom"}, sqlite_db)
+        sqlite_db.expire_all()
+        job = await sqlite_db.get(ScrapeJob, job_id)
+        assert job.status == "completed"
+        assert job.completed_companies == 2
+        assert job.failed_scrapes == 1
+        assert job.finished_at is not None
+        assert len(await service.get_job_results(job_id, sqlite_db)) == 2
+        
+        await service.record_job_result(job_id, company_ids[1], {"company_id": company_ids[1], "aum_found": True}, sqlite_db)
+        sqlite_db.expire_all()
+        job = await sqlite_db.get(ScrapeJob, job_id)
+        assert job.completed_companies == 2
+        assert (job.successful_scrapes, job.failed_scrapes) == (1, 1)
+    
+    @pytest.mark.asyncio
+    async def test_job_chunk_scrapes_companies_on_one_loop_and_skips_recorded_items(self, session_factory, sqlite_db):
+        from app.models import ScrapeJob
+        from app.services import scraping_service
+        from app.tasks import _scrape_companies_for_job
+        sqlite_db.add_all([Company(id=1, name="A"), Company(id=2, name="B")])
+        await sqlite_db.commit()
+        
+        running = []
+        peak = []
+        
+        async def scrape(company):
+            running.append(company.id)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(company.id)
+            return {"company_id": company.id, "company_name": company.name, "aum_found": company.id == 1}
+        
+        with patch.object(scraping_service, 'session_factory', session_factory), \
+             patch('app.tasks.SessionLocal', session_factory), \
+             patch('app.tasks.scrape_companies_task.delay') as mock_delay, \
+             patch.object(scraping_service, 'scrape_company', side_effect=scrape) as mock_scrape:
+            job = await scraping_service.create_scrape_job(None, sqlite_db)
+            job_id = job.id
+            company_ids = mock_delay.call_args.args[1]
+            
+            results = await _scrape_companies_for_job(job_id, company_ids + [99])
+            redelivered = await _scrape_companies_for_job(job_id, company_ids)
+        
+        assert len(results) == 2
+        assert max(peak) == 2
+        assert redelivered == []
+        assert mock_scrape.call_count == 2
+        job = await sqlite_db.get(ScrapeJob, job_id, populate_existing=True)
+        assert (job.status, job.completed_companies, job.successful_scrapes) == ("completed", 2, 1)
+    
+    @pytest.mark.asyncio
+    async def test_job_chunk_records_results_when_flush_fails(self, session_factory, sqlite_db, isolated_bulk_writer):
+        from app.models import ScrapeJob
+        from app.services import scraping_service
+        from app.tasks import _scrape_companies_for_job
+        sqlite_db.add(Company(id=1, name="A"))
+        await sqlite_db.commit()
+        
+        async def scrape(company):
+            isolated_bulk_writer.add(ScrapeLog, {"company_id": company.id, "url": "https://a.com", "status": "success"})
+            return {"company_id": company.id, "company_name": company.name, "aum_found": False}
+        
+        with patch.object(scraping_service, 'session_factory', session_factory), \
+             patch('app.tasks.SessionLocal', session_factory), \
+             patch('app.tasks.scrape_companies_task.delay'), \
+             patch.object(scraping_service, 'scrape_company', side_effect=scrape), \
+             patch('app.budget.budget_governor.flush', side_effect=RuntimeError("db down")):
+            job = await scraping_service.create_scrape_job(None, sqlite_db)
+            job_id = job.id
+            with patch.object(isolated_bulk_writer, '_write', side_effect=RuntimeError("db down")):
+                with pytest.raises(RuntimeError):
+                    await _scrape_companies_for_job(job_id, [1])
+        
+        job = await sqlite_db.get(ScrapeJob, job_id, populate_existing=True)
+        assert (job.status, job.completed_companies) == ("completed", 1)
+        assert isolated_bulk_writer.pending == 1
+        await isolated_bulk_writer.flush()
+        assert await count_rows(sqlite_db, ScrapeLog) == 1
+    
+    @pytest.mark.asyncio
+    async def test_scrape_job_fails_unpublished_companies(self, service, sqlite_db):
+        from app.models import ScrapeJob
+        sqlite_db.add_all([Company(name="A"), Company(name="B"), Company(name="C")])
+        await sqlite_db.commit()
+        
+        calls = []
+        
+        def delay(job_id, company_ids):
+            calls.extend(company_ids)
+            if len(calls) == 2:
+                raise ConnectionError("broker down")
+        
+        with patch('app.services.settings.job_chunk_size', 1), \
+             patch('app.tasks.scrape_companies_task.delay', side_effect=delay):
+            with pytest.raises(Exception, match="broker down"):
+                await service.create_scrape_job(None, sqlite_db)
+        
+        job = await sqlite_db.scalar(select(ScrapeJob).execution_options(populate_existing=True))
+        assert job.status == "running"
+        assert (job.completed_companies, job.failed_scrapes) == (2, 2)
+        
+        job_id = job.id
+        await service.record_job_result(job_id, calls[0], {"company_id": calls[0], "aum_found": True}, sqlite_db)
+        sqlite_db.expire_all()
+        job = await sqlite_db.get(ScrapeJob, job_id)
+        assert job.status == "completed"
+        
+        with patch('app.tasks.scrape_companies_task.delay', side_effect=ConnectionError("broker down")):
+            with pytest.raises(Exception):
+                job = await service.create_scrape_job(None, sqlite_db)
+        
+        failed = await sqlite_db.scalar(select(ScrapeJob).where(ScrapeJob.status == "failed"))
+        assert failed.finished_at is not None
+        assert failed.completed_companies == 3
+    
+    @pytest.mark.asyncio
+    async def test_iter_scrape_companies_yields_in_completion_order(self, service):
+        companies = [Company(id=1, name="Slow"), Company(id=2, name="Fast"), Company(id=3, name="Broken")]
+        
+        async def scrape(company):
+            if company.name == "Broken":
+                raise RuntimeError("boom")
+            await asyncio.sleep(0.1 if company.name == "Slow" else 0)
+            return {"company_id": company.id, "company_name": company.name, "aum_found": company.name == "Fast"}
+        
+        service.max_concurrent_companies = 2
+        with patch.object(service, 'scrape_company', side_effect=scrape):
+            events = [event async for event in service.iter_scrape_companies(companies)]
+        
+        assert [event["result"]["company_name"] for event in events] == ["Fast", "Broken", "Slow"]
+        assert events[1]["result"]["error"] == "boom"
+        assert events[-1]["progress"]["completed"] == 3
+        assert events[-1]["progress"]["successful"] == 1
+        assert events[-1]["progress"]["failed"] == 2
+        assert events[-1]["progress"]["eta_seconds"] == 0
+        assert events[-1]["progress"]["done"] == True
+    
+    @pytest.mark.asyncio
+    async def test_job_progress_streams_published_results(self, service, sqlite_db):
+        sqlite_db.add(Company(name="A"))
+        await sqlite_db.commit()
+        
+        with patch('app.tasks.scrape_companies_task.delay') as mock_delay:
+            job = await service.create_scrape_job(None, sqlite_db)
+        job_id = job.id
+        company_id = mock_delay.call_args.args[1][0]
+        
+        events = []
+        
+        async def follow():
+            async for event in service.iter_job_progress(job_id):
+                events.append(event)
+        
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0.05)
+        await service.record_job_result(job_id, company_id, {
+            "company_id": company_id,
+            "company_name": "A",
+            "aum_found": True,
+            "aum_snapshots": [{"aum_value": "R$ 1 bi", "confidence_score": 0.9}]
+        }, sqlite_db)
+        await asyncio.wait_for(follower, timeout=1)
+        
+        assert [event["type"] for event in events] == ["progress", "result", "complete"]
+        assert events[0]["progress"]["completed"] == 0
+        assert events[1]["result"] == {
+            "company_id": company_id, "company_name": "A", "aum_found": True, "aum_value": "R$ 1 bi", "error": None
+        }
+        assert events[2]["progress"]["done"] == True
 
 class TestModels:
     def test_company_model(self):